@@ -0,0 +1,55 @@
+"""Concurrent-client throughput and latency of the JSON API.
+
+Runs ``--clients`` keep-alive clients against the post list and a post
+detail endpoint for ``--duration`` seconds and reports requests per second
+and latency percentiles. Run it once per serving mode to compare them, from
+inside the web container so nginx and its cache stay out of the picture:
+
+    SERVER_MODE=wsgi docker compose up -d web
+    docker exec blog_django python benchmarks/api_concurrency.py http://localhost:8000
+    SERVER_MODE=asgi docker compose up -d web
+    docker exec blog_django python benchmarks/api_concurrency.py http://localhost:8000
+
+Keep PAGE_CACHE_TIMEOUT at 0 while measuring, or anonymous requests are
+answered from the page cache in both modes. Standard library only; see
+suite.py for every endpoint.
+"""
+import argparse
+import json
+
+from loadgen import connect, fetch, run_load
+
+
+def run(base, clients, duration, prefix):
+    conn = connect(base)
+    status, _, body = fetch(conn, f"{prefix}/posts/")
+    conn.close()
+    if status != 200:
+        raise SystemExit(f"{prefix}/posts/ returned {status}")
+    posts = json.loads(body)["posts"]
+    paths = [f"{prefix}/posts/"] + [f"{prefix}/posts/{p['slug']}/" for p in posts[:5]]
+    return run_load(base, paths, clients, duration, {"Accept": "application/json"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base_url", help="e.g. http://localhost:8000")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=15, help="seconds per run")
+    parser.add_argument("--prefix", default="/blog/api", help="API mount point")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per run")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{'clients':>7} {'requests':>9} {'errors':>6} {'req/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    for clients in args.clients:
+        result = run(args.base_url.rstrip("/"), clients, args.duration, args.prefix)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{result['clients']:>7} {result['requests']:>9} {result['errors']:>6} {result['rps']:>8} "
+                  f"{result['p50_ms']:>7} {result['p95_ms']:>7} {result['p99_ms']:>7}")
+
+
+if __name__ == "__main__":
+    main()
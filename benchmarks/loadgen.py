@@ -0,0 +1,107 @@
+"""Closed-loop HTTP load generator shared by the benchmark scripts.
+
+Each client is a thread with its own keep-alive connection that requests
+the given paths in turn, as fast as responses come back, until the
+deadline. Standard library only, so it runs inside the app container.
+"""
+import http.client
+import re
+import statistics
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+
+def connect(base):
+    url = urlsplit(base)
+    conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    return conn_class(url.netloc, timeout=30)
+
+
+def fetch(conn, path, method="GET", body=None, headers=None):
+    """Return ``(status, headers, body)``."""
+    conn.request(method, path, body=body, headers={"Accept": "*/*", **(headers or {})})
+    response = conn.getresponse()
+    return response.status, response.msg, response.read()
+
+
+def login(base, username, password, path="/accounts/login/"):
+    """Log in through the HTML form; return the Cookie header to send."""
+    conn = connect(base)
+    cookies = SimpleCookie()
+    status, headers, body = fetch(conn, path)
+    for header in headers.get_all("Set-Cookie") or []:
+        cookies.load(header)
+    match = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', body)
+    if status != 200 or not match:
+        raise RuntimeError(f"GET {path} returned {status} without a login form")
+    form = urlencode({"username": username, "password": password,
+                      "csrfmiddlewaretoken": match.group(1).decode()})
+    status, headers, _ = fetch(conn, path, "POST", form, {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "Cookie": "; ".join(f"{k}={m.value}" for k, m in cookies.items()),
+    })
+    for header in headers.get_all("Set-Cookie") or []:
+        cookies.load(header)
+    conn.close()
+    if status != 302 or "sessionid" not in cookies:
+        raise RuntimeError(f"Login as {username!r} failed (HTTP {status})")
+    return "; ".join(f"{k}={m.value}" for k, m in cookies.items())
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(p / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _client(base, paths, deadline, headers, latencies, errors, lock):
+    conn = connect(base)
+    mine, failed, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, _, _ = fetch(conn, path, headers=headers)
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            continue
+        if status >= 400:
+            failed += 1
+        mine.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        latencies.extend(mine)
+        errors[0] += failed
+
+
+def run_load(base, paths, clients, duration, headers=None):
+    """Drive ``paths`` with ``clients`` concurrent clients; return the stats."""
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(base, paths, deadline, headers, latencies, errors, lock))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
@@ -0,0 +1,133 @@
+"""Repeatable load benchmark over every public and authenticated page.
+
+Seed a data set, start a server, then run the suite against it:
+
+    python manage.py seed_inkwell --seed 1
+    gunicorn --config gunicorn.conf.py &
+    python benchmarks/suite.py http://localhost:8000 --clients 10 --duration 10
+
+Each endpoint is driven in turn by ``--clients`` concurrent keep-alive
+clients; throughput and p50/p95/p99 latency are printed and written to
+``benchmarks/results/<commit>.json``. Pass an earlier results file with
+``--compare`` to print the change per endpoint. Authenticated pages log in
+as a seeded user (``seed0`` / ``inkwell-bench`` by default).
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from loadgen import connect, fetch, login, run_load
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _api(base, path):
+    conn = connect(base)
+    status, _, body = fetch(conn, path, headers={"Accept": "application/json"})
+    conn.close()
+    if status != 200:
+        raise SystemExit(f"{path} returned {status}; is the server up and seeded?")
+    return json.loads(body)
+
+
+def endpoints(base, username, query):
+    """``{name: (paths, authenticated)}`` for every page worth measuring."""
+    posts = _api(base, "/blog/api/posts/?limit=20")["posts"]
+    if not posts:
+        raise SystemExit("No published posts; run `manage.py seed_inkwell` first.")
+    own = _api(base, f"/blog/api/posts/?author={username}&limit=5")["posts"]
+    slugs = [p["slug"] for p in posts[:10]]
+    authors = sorted({p["author"] for p in posts})[:5]
+    found = {
+        # Logged out
+        "landing": (["/"], False),
+        "login": (["/accounts/login/"], False),
+        "public-profile": ([f"/user/{a}/" for a in authors], False),
+        "post-search": ([f"/blog/search/?q={query}"], False),
+        "api-docs": (["/blog/api/"], False),
+        "api-post-list": (["/blog/api/posts/"], False),
+        "api-post-detail": ([f"/blog/api/posts/{s}/" for s in slugs], False),
+        "api-post-search": ([f"/blog/api/posts/search/?q={query}"], False),
+        # Logged in
+        "feed": (["/"], True),
+        "blog-home": (["/blog/"], True),
+        "post-detail": ([f"/blog/{s}/" for s in slugs], True),
+        "post-create": (["/blog/new/"], True),
+        "profile": (["/user/profile/"], True),
+    }
+    if own:
+        found["post-edit"] = ([f"/blog/{p['slug']}/edit/" for p in own], True)
+    return found
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print(results, baseline=None):
+    header = f"{'endpoint':<16} {'req/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'errors':>6}"
+    if baseline:
+        header += f" {'Δ req/s':>8} {'Δ p99':>7}"
+    print(header)
+    for name, r in results.items():
+        line = f"{name:<16} {r['rps']:>8} {r['p50_ms']:>7} {r['p95_ms']:>7} {r['p99_ms']:>7} {r['errors']:>6}"
+        old = (baseline or {}).get(name)
+        if old:
+            line += f" {_change(r['rps'], old['rps']):>8} {_change(r['p99_ms'], old['p99_ms']):>7}"
+        print(line)
+
+
+def _change(new, old):
+    return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base_url", help="e.g. http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    parser.add_argument("--username", default="seed0")
+    parser.add_argument("--password", default="inkwell-bench")
+    parser.add_argument("--query", default="python", help="search term for the search endpoints")
+    parser.add_argument("--only", nargs="+", metavar="ENDPOINT", help="run just these endpoints")
+    parser.add_argument("--output", type=Path, help="results file (default: results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, metavar="RESULTS", help="earlier results file to diff against")
+    args = parser.parse_args()
+    base = args.base_url.rstrip("/")
+
+    cookie = login(base, args.username, args.password)
+    results = {}
+    for name, (paths, authenticated) in endpoints(base, args.username, args.query).items():
+        if args.only and name not in args.only:
+            continue
+        print(f"… {name}", file=sys.stderr)
+        results[name] = run_load(base, paths, args.clients, args.duration,
+                                 {"Cookie": cookie} if authenticated else None)
+
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else None
+    _print(results, baseline)
+
+    commit = _commit()
+    output = args.output or RESULTS_DIR / f"{commit or time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "base_url": base,
+        "clients": args.clients,
+        "duration": args.duration,
+        "results": results,
+    }, indent=2) + "\n")
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
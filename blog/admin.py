@@ -1,25 +1,71 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 
+from . import counters, fragments
 from .models import Comment, Post, Tag
+from .pagination import EstimatedCountPaginator
+from .search import search_posts
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ["name", "slug"]
+    list_display = ["name", "slug", "post_count"]
     prepopulated_fields = {"slug": ("name",)}
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ["title", "author", "published", "created_at"]
+    list_display = ["title", "author", "published", "comment_count", "created_at"]
     list_filter = ["published", "created_at", "tags"]
-    search_fields = ["title", "content"]
+    list_select_related = ["author"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ["title", "content"]  # shown in the search box; matching uses the full-text index
     prepopulated_fields = {"slug": ("title",)}
     filter_horizontal = ["tags"]
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
+
+def _set_approved(modeladmin, request, queryset, approved):
+    # One UPDATE for the comments, one for the counters of their posts; the
+    # post_save receivers that normally keep these in step do not fire.
+    changed = queryset.exclude(approved=approved)
+    with transaction.atomic():
+        post_ids = set(changed.values_list("post_id", flat=True))
+        n = changed.update(approved=approved)
+        counters.recount_comments(Post.objects.filter(pk__in=post_ids))
+    fragments.bump_posts(post_ids, "comments")
+    modeladmin.message_user(
+        request, f"{n} comment{'s' if n != 1 else ''} {'approved' if approved else 'unapproved'}.", messages.SUCCESS,
+    )
+
+
+@admin.action(description="Approve selected comments", permissions=["change"])
+def approve_comments(modeladmin, request, queryset):
+    _set_approved(modeladmin, request, queryset, True)
+
+
+@admin.action(description="Unapprove selected comments", permissions=["change"])
+def unapprove_comments(modeladmin, request, queryset):
+    _set_approved(modeladmin, request, queryset, False)
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ["author", "post", "created_at", "approved"]
     list_filter = ["approved", "created_at"]
     search_fields = ["body"]
+    list_select_related = ["author", "post"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [approve_comments, unapprove_comments]
+
+    def get_queryset(self, request):
+        # The changelist only shows each post's title.
+        return super().get_queryset(request).defer(
+            "post__content", "post__content_html", "post__excerpt", "post__summary",
+        )
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def _install_search_index(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        from .search import install_sqlite_index
+        install_sqlite_index(connection)
 
 
 class BlogConfig(AppConfig):
     name = 'blog'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(_install_search_index, sender=self)
+        if settings.METRICS_ENABLED:
+            from .metrics import install_query_timer
+            connection_created.connect(install_query_timer)
@@ -0,0 +1,86 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from .models import Comment, DeletedPost, Post
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+
+def posts_changed_at():
+    """Newest post edit, new comment or published-post deletion.
+
+    Changes written with ``update()``, such as comment approvals, and
+    changes to a post's tags do not move it. Validators of pages that show
+    those combine it with the ``feed`` fragment stamp, which they bump.
+    """
+    stamps = (
+        Post.objects.aggregate(t=Max("updated_at"))["t"],
+        Comment.objects.aggregate(t=Max("created_at"))["t"],
+        DeletedPost.objects.aggregate(t=Max("deleted_at"))["t"],
+    )
+    return max(filter(None, stamps), default=None)
+
+
+def _preconditions(request, parts, last_modified):
+    """Return ``(etag, timestamp, not_modified_response_or_None)``."""
+    etag = make_etag(*parts) if parts is not None else None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _add_validators(request, response, etag, timestamp, cache_control):
+    if etag:
+        response.headers.setdefault("ETag", etag)
+    if timestamp:
+        response.headers.setdefault("Last-Modified", http_date(timestamp))
+    directives = cache_control(request) if callable(cache_control) else cache_control
+    patch_cache_control(response, **directives)
+    return response
+
+
+def conditional(validators, cache_control):
+    """Answer GET/HEAD with 304 when the client's validators still match.
+
+    Like ``django.views.decorators.http.condition``, except that
+    ``validators(request, *args, **kwargs)`` returns ``(etag_parts,
+    last_modified)`` in one go so both headers come from the same cheap
+    query, and ``cache_control`` (a dict, or a callable taking the request)
+    is applied to both full and 304 responses. The view itself only runs when
+    the body is actually needed. Async views are supported; their validators
+    still run synchronously, in a worker thread.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                parts, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+                etag, timestamp, response = _preconditions(request, parts, last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                return _add_validators(request, response, etag, timestamp, cache_control)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            parts, last_modified = validators(request, *args, **kwargs)
+            etag, timestamp, response = _preconditions(request, parts, last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return _add_validators(request, response, etag, timestamp, cache_control)
+        return wrapper
+    return decorator
@@ -0,0 +1,41 @@
+"""Denormalized counters: Post.comment_count and Tag.post_count.
+
+The bump_* helpers are called from blog.signals on every write so that
+listings never have to aggregate; recount() repairs any drift left by bulk
+operations that bypass signals.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post, Tag
+
+
+def bump_comments(post_id, n):
+    Post.objects.filter(pk=post_id).update(comment_count=F("comment_count") + n)
+
+
+def bump_tags(tags, n):
+    """Add ``n`` to the post_count of every tag in the ``tags`` queryset."""
+    tags.update(post_count=F("post_count") + n)
+
+
+def _count(queryset, group_by):
+    return Coalesce(
+        Subquery(queryset.values(group_by).annotate(n=Count("pk")).values("n")),
+        Value(0),
+    )
+
+
+def recount_comments(posts):
+    """Recompute comment_count for the ``posts`` queryset in one UPDATE."""
+    posts.update(comment_count=_count(
+        Comment.objects.filter(post=OuterRef("pk"), approved=True).order_by(), "post"))
+
+
+def recount(posts=None, tags=None):
+    """Recompute counters from scratch, for all rows or the given querysets."""
+    posts = Post.objects.all() if posts is None else posts
+    tags = Tag.objects.all() if tags is None else tags
+    recount_comments(posts)
+    tags.update(post_count=_count(
+        Post.objects.filter(tags=OuterRef("pk"), published=True).order_by(), "tags"))
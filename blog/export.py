@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DeletedPost, Post
+from .pagination import InvalidCursor, pack_cursor, unpack_cursor
+
+# Rows younger than this are left for the next export so that a transaction
+# which stamped updated_at earlier but commits later is not skipped.
+SETTLE_TIME = timedelta(seconds=2)
+CHUNK_SIZE = 500
+
+
+def parse_export_cursor(cursor):
+    """Return the (timestamp, id) positions in the post and deletion streams."""
+    try:
+        post_pos, deletion_pos = unpack_cursor(cursor)
+        return tuple(
+            (datetime.fromisoformat(pos[0]), int(pos[1])) if pos else None
+            for pos in (post_pos, deletion_pos)
+        )
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _after(qs, field, pos):
+    stamp, pk = pos
+    return qs.filter(Q(**{f"{field}__gt": stamp}) | Q(**{field: stamp, "id__gt": pk}))
+
+
+def export_lines(post_pos, deletion_pos, initial, serialize):
+    """Yield NDJSON lines for every change after the given positions.
+
+    Changed posts come first in (updated_at, id) order, then deletion
+    tombstones in (deleted_at, id) order; the last line carries the cursor to
+    resume from.
+    """
+    horizon = timezone.now() - SETTLE_TIME
+    posts = (Post.objects
+             .filter(updated_at__lte=horizon)
+             .select_related("author")
+             .prefetch_related("tags")
+             .order_by("updated_at", "id"))
+    if initial:
+        # A fresh mirror has nothing to delete: skip drafts and old deletions,
+        # and start the next sync after the newest row of either kind.
+        latest_post = (Post.objects.filter(updated_at__lte=horizon)
+                       .order_by("updated_at", "id").values_list("updated_at", "id").last())
+        latest_deletion = (DeletedPost.objects.filter(deleted_at__lte=horizon)
+                           .order_by("deleted_at", "id").values_list("deleted_at", "id").last())
+        posts = posts.filter(published=True)
+        deletions = DeletedPost.objects.none()
+        deletion_pos = latest_deletion
+    else:
+        if post_pos:
+            posts = _after(posts, "updated_at", post_pos)
+        deletions = DeletedPost.objects.filter(deleted_at__lte=horizon).order_by("deleted_at", "id")
+        if deletion_pos:
+            deletions = _after(deletions, "deleted_at", deletion_pos)
+
+    for post in posts.iterator(chunk_size=CHUNK_SIZE):
+        if post.published:
+            line = {"type": "post", **serialize(post, include_content=True)}
+        else:
+            line = {"type": "tombstone", "id": post.id, "reason": "unpublished"}
+        yield json.dumps(line) + "\n"
+        post_pos = (post.updated_at, post.id)
+    if initial:
+        post_pos = latest_post
+    for deletion in deletions.iterator(chunk_size=CHUNK_SIZE):
+        yield json.dumps({"type": "tombstone", "id": deletion.post_id, "reason": "deleted"}) + "\n"
+        deletion_pos = (deletion.deleted_at, deletion.id)
+
+    cursor = pack_cursor([[pos[0].isoformat(), pos[1]] if pos else None for pos in (post_pos, deletion_pos)])
+    yield json.dumps({"type": "cursor", "cursor": cursor}) + "\n"
+
+
+async def aexport_lines(*args, **kwargs):
+    """``export_lines`` for ASGI, fetched a chunk at a time off the event loop.
+
+    Handed a sync iterator, Django's ASGI handler collects all of it before
+    sending anything; this keeps the export streaming instead. The queries
+    all run in the one thread sync_to_async uses for database work.
+    """
+    lines = export_lines(*args, **kwargs)
+    next_chunk = sync_to_async(lambda: list(islice(lines, CHUNK_SIZE)))
+    try:
+        while chunk := await next_chunk():
+            for line in chunk:
+                yield line
+    finally:
+        await sync_to_async(lines.close)()
@@ -0,0 +1,159 @@
+"""RSS and Atom feeds of recent posts: site-wide, per author and per tag.
+
+Each feed lists the newest FEED_ITEMS published posts. The validators read
+just the ids, ``updated_at`` and authors of those posts, an index range scan,
+and derive both the ETag and Last-Modified from them, so a poller whose copy
+is current gets a 304 without anything being rendered. Tag and author names
+are not in those rows, so the ETag also carries the ``blog.fragments`` stamps
+that renaming them bumps. A changed feed is
+rendered once and cached under its ETag; every other reader of that version
+is served the stored bytes.
+"""
+from django.contrib.auth.models import User
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import fragments
+from .conditional import conditional, make_etag
+from .models import Post, Tag
+
+FEED_ITEMS = 20
+FEED_CACHE_CONTROL = {"public": True, "max_age": 300}
+# Entries are keyed on content, so they never go stale; this only bounds
+# how long versions nobody asks for any more linger.
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class PostsFeed(Feed):
+    title = "Inkwell"
+    description = "New posts on Inkwell."
+
+    def link(self):
+        return reverse("home")
+
+    def posts(self, obj):
+        """Published posts in this feed, newest first, unsliced."""
+        return Post.objects.filter(published=True).order_by("-created_at", "-id")
+
+    def stamp_names(self, obj):
+        """Fragment stamps, besides those of the listed posts' authors, to validate on."""
+        return (fragments.TAGS,)
+
+    def items(self, obj):
+        return (self.posts(obj).for_listing()
+                .select_related("author").prefetch_related("tags")[:FEED_ITEMS])
+
+    def item_title(self, post):
+        return post.title
+
+    def item_description(self, post):
+        return post.summary
+
+    def item_link(self, post):
+        return reverse("blog:post-detail", args=[post.slug])
+
+    def item_pubdate(self, post):
+        return post.created_at
+
+    def item_updateddate(self, post):
+        return post.updated_at
+
+    def item_author_name(self, post):
+        return post.author.username
+
+    def item_categories(self, post):
+        return [tag.name for tag in post.tags.all()]
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f"{author.username} — Inkwell"
+
+    def description(self, author):
+        return f"New posts by {author.username} on Inkwell."
+
+    def link(self, author):
+        return reverse("user:public-profile", args=[author.username])
+
+    def posts(self, author):
+        return super().posts(author).filter(author=author)
+
+    def stamp_names(self, author):
+        return (*super().stamp_names(author), fragments.author_key(author.pk))
+
+
+class TagFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def title(self, tag):
+        return f"{tag.name} — Inkwell"
+
+    def description(self, tag):
+        return f"New posts tagged {tag.name} on Inkwell."
+
+    def link(self, tag):
+        return reverse("blog:tag-posts", args=[tag.slug])
+
+    def posts(self, tag):
+        return super().posts(tag).filter(tags=tag)
+
+    def stamp_names(self, tag):
+        return (*super().stamp_names(tag), fragments.tag_key(tag.pk))
+
+
+class AtomPostsFeed(PostsFeed):
+    feed_type = Atom1Feed
+    subtitle = PostsFeed.description
+
+
+class AtomAuthorFeed(AuthorFeed):
+    feed_type = Atom1Feed
+    subtitle = AuthorFeed.description
+
+
+class AtomTagFeed(TagFeed):
+    feed_type = Atom1Feed
+    subtitle = TagFeed.description
+
+
+def cached_feed(feed_class):
+    """A view serving ``feed_class`` with validators and a rendered-body cache."""
+    feed = feed_class()
+
+    def validators(request, **kwargs):
+        obj = feed.get_object(request, **kwargs)
+        rows = list(feed.posts(obj).values_list("id", "updated_at", "author_id")[:FEED_ITEMS])
+        stamps = fragments.versions(*feed.stamp_names(obj), *(fragments.author_key(a) for _, _, a in rows))
+        # The view runs only when the body is needed, and then renders or
+        # reuses the version these rows and stamps identify.
+        request.feed_etag = make_etag(feed_class.__name__, kwargs, rows, sorted(stamps.items()))
+        return (request.feed_etag,), max((updated for _, updated, _ in rows), default=None)
+
+    @conditional(validators, FEED_CACHE_CONTROL)
+    def view(request, **kwargs):
+        key = f"feed:{request.feed_etag}"
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, **kwargs)
+            cached = (response["Content-Type"], response.content)
+            cache.set(key, cached, CACHE_TIMEOUT)
+        content_type, body = cached
+        return HttpResponse(body, content_type=content_type)
+
+    return view
+
+
+posts_rss = cached_feed(PostsFeed)
+posts_atom = cached_feed(AtomPostsFeed)
+author_rss = cached_feed(AuthorFeed)
+author_atom = cached_feed(AtomAuthorFeed)
+tag_rss = cached_feed(TagFeed)
+tag_atom = cached_feed(AtomTagFeed)
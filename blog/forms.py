@@ -1,9 +1,45 @@
 from django import forms
+from django.utils.text import slugify
 
-from .models import Comment, Post
+from .importing import upsert_tags
+from .models import Comment, Post, Tag
+
+
+class TagNamesField(forms.Field):
+    """Tag names, one hidden input each, as added in the editor.
+
+    Only the post's own tags are rendered, never the whole vocabulary.
+    Names that are not tags yet are created when the form is saved.
+    """
+
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        "invalid": "Tag names need at least one letter or digit.",
+        "max_length": "Tag names can be at most %(limit)d characters.",
+    }
+
+    def prepare_value(self, value):
+        return [tag.name if isinstance(tag, Tag) else tag for tag in value or ()]
+
+    def to_python(self, value):
+        """Tidied names, one per slug; "Python" and "python" are one tag."""
+        limit = Tag._meta.get_field("name").max_length
+        names = {}
+        for name in value or ():
+            name = " ".join(name.split())
+            if not name:
+                continue
+            if len(name) > limit:
+                raise forms.ValidationError(self.error_messages["max_length"], "max_length", {"limit": limit})
+            if not slugify(name):
+                raise forms.ValidationError(self.error_messages["invalid"], "invalid")
+            names.setdefault(slugify(name), name)
+        return list(names.values())
 
 
 class PostForm(forms.ModelForm):
+    tags = TagNamesField(required=False)
+
     class Meta:
         model = Post
         fields = ["title", "excerpt", "content", "tags", "published"]
@@ -22,9 +58,14 @@ class PostForm(forms.ModelForm):
                 "placeholder": "Write your post in Markdown...",
                 "spellcheck": "false",
             }),
-            "tags": forms.CheckboxSelectMultiple(),
         }
 
+    def save(self, commit=True):
+        # save_m2m() needs tags, not names; the new ones go in with one INSERT.
+        tags = upsert_tags(self.cleaned_data["tags"]).values()
+        self.cleaned_data["tags"] = list({tag.pk: tag for tag in tags}.values())
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
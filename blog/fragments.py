@@ -0,0 +1,126 @@
+"""Version keys for cached template fragments.
+
+Templates cache fragments with ``{% cache %}``, varying on a version stamp
+rather than on the data itself:
+
+``feed``
+    the public feed page as a whole;
+``post:<id>``
+    a post card and article header (title, summary, dates, comment count);
+``post:<id>:tags``
+    a post's tag list;
+``post:<id>:comments``
+    a post's comment thread;
+``author:<id>``
+    anything listing an author's posts;
+``tag:<id>``
+    anything listing a tag's posts;
+``tags``
+    the tag cloud: every tag in use and its published-post count.
+
+Signals in ``blog.signals`` bump the stamps when the rows behind them
+change. A bumped fragment is never looked up again and simply ages out, so
+nothing has to be deleted and the scheme works on any cache backend,
+including locmem and file-based ones. Article bodies need no stamp: they
+vary on ``Post.content_html_key``, which already changes with the content.
+
+The same stamps double as surrogate keys for the anonymous page cache in
+``blog.pagecache``.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import transaction
+
+FEED = "feed"
+TAGS = "tags"
+
+# ``{name: stamp}`` for the stamps ``versions`` created, while a ``created``
+# block is collecting them.
+_created = ContextVar("fragment_stamps_created", default=None)
+
+
+def post_key(post_id, part=None):
+    return f"post:{post_id}:{part}" if part else f"post:{post_id}"
+
+
+def author_key(user_id):
+    return f"author:{user_id}"
+
+
+def tag_key(tag_id):
+    return f"tag:{tag_id}"
+
+
+def _cache_key(name):
+    return f"fragment-version:{name}"
+
+
+def versions(*names):
+    """Return ``{name: stamp}``, creating stamps that are not cached yet."""
+    keys = {_cache_key(name): name for name in names}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+        collected = _created.get()
+        if collected is not None:
+            collected.update((keys[key], stamp) for key, stamp in missing.items())
+    return {keys[key]: stamp for key, stamp in found.items()}
+
+
+@contextmanager
+def created():
+    """Collect ``{name: stamp}`` for every stamp ``versions`` creates in the block.
+
+    A new stamp records no write, only that the name had not been read yet.
+    """
+    collected = {}
+    token = _created.set(collected)
+    try:
+        yield collected
+    finally:
+        _created.reset(token)
+
+
+def version(name):
+    return versions(name)[name]
+
+
+def bump(*names):
+    """Invalidate every fragment that varies on one of ``names``.
+
+    Stamps are bumped now and again once the transaction commits, so a
+    request that renders from pre-commit data in between cannot leave a
+    stale fragment behind under the new stamp.
+    """
+    if not names:
+        return
+
+    def _bump():
+        stamp = time.time_ns()
+        cache.set_many({_cache_key(name): stamp for name in names}, timeout=None)
+
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def bump_posts(post_ids, *parts):
+    """Bump the feed and ``post:<id>`` plus ``post:<id>:<part>`` for each post."""
+    bump(FEED, *(post_key(pk, part) for pk in post_ids for part in (None, *parts)))
+
+
+def bump_tags(tag_ids):
+    """Bump the tag cloud and ``tag:<id>`` for each tag."""
+    bump(TAGS, *(tag_key(pk) for pk in tag_ids))
+
+
+def attach_versions(posts):
+    """Set ``fragment_version`` on each post with a single cache lookup."""
+    stamps = versions(*(post_key(post.pk) for post in posts))
+    for post in posts:
+        post.fragment_version = stamps[post_key(post.pk)]
+    return posts
@@ -0,0 +1,270 @@
+"""Bulk post import.
+
+``import_posts`` takes an iterable of record dicts (``title``, ``content``
+and optionally ``slug``, ``excerpt``, ``tags``, ``published``, ``author``,
+``created_at``/``date``) and writes them in batches: one prefix query
+allocates unique slugs for the whole batch, tags are upserted with a single
+``bulk_create``, and posts and their tag links go in with ``bulk_create``.
+Tag counters, activity rollups and cached fragments, which signals maintain
+for single saves, are brought up to date afterwards.
+
+``read_markdown_dir`` and ``read_jsonl`` stream records from a directory of
+Markdown files with front matter or from a JSONL file.
+"""
+import json
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, time as dt_time
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import slugify
+
+from user import activity
+
+from . import counters, fragments
+from .models import RESERVED_SLUGS, Post, Tag
+from .rendering import render_key, render_markdown, summarize
+
+# Leaves room for a "-<n>" suffix within the 50-character slug column.
+SLUG_BASE_LENGTH = 40
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\n(.*?)\n---[ \t]*(?:\n|\Z)", re.S)
+_TRUE = {"1", "true", "yes", "on"}
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+# ── Slugs and tags ───────────────────────────────────────────────────────────
+
+def _slug_base(text):
+    return slugify(text)[:SLUG_BASE_LENGTH].strip("-") or "post"
+
+
+def allocate_slugs(texts):
+    """Unique slugs for ``texts``: ``base``, then ``base-1``, ``base-2``...
+
+    Slugs already taken are found with one query for the whole list, and
+    slugs handed out earlier in the list are skipped as well, as are the
+    route names in ``RESERVED_SLUGS``.
+    """
+    bases = [_slug_base(text) for text in texts]
+    if not bases:
+        return []
+    taken = set(Post.objects.filter(
+        reduce(or_, (Q(slug=base) | Q(slug__startswith=f"{base}-") for base in set(bases)))
+    ).values_list("slug", flat=True)) | RESERVED_SLUGS
+    next_suffix = defaultdict(lambda: 1)
+    slugs = []
+    for base in bases:
+        slug = base
+        while slug in taken:
+            slug = f"{base}-{next_suffix[base]}"
+            next_suffix[base] += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def upsert_tags(names):
+    """Return ``{name: Tag}``, creating the missing tags in one INSERT.
+
+    A new name whose slug belongs to an existing tag ("Python" next to
+    "python") maps to that tag rather than failing the unique constraint.
+    """
+    slugs = {name: slugify(name) for name in names if slugify(name)}
+    Tag.objects.bulk_create([Tag(name=name, slug=slug) for name, slug in slugs.items()], ignore_conflicts=True)
+    by_slug = {tag.slug: tag for tag in Tag.objects.filter(Q(name__in=slugs) | Q(slug__in=slugs.values()))}
+    by_name = {tag.name: tag for tag in by_slug.values()}
+    return {name: by_name.get(name) or by_slug[slug] for name, slug in slugs.items()}
+
+
+# ── Record parsing ───────────────────────────────────────────────────────────
+
+def parse_front_matter(text):
+    """Split ``---``-fenced front matter off a Markdown document.
+
+    Understands the YAML subset archives actually use: ``key: value``
+    scalars, ``[a, b]`` lists and ``- item`` block lists.
+    """
+    match = _FRONT_MATTER.match(text)
+    if not match:
+        return {}, text
+    meta, key = {}, None
+    for line in match.group(1).splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key:
+            meta[key] = [*(meta[key] or []), stripped[2:].strip().strip("\"'")]
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            raise InvalidRecord(f"Bad front matter line: {line!r}")
+        key, value = key.strip().lower(), value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            value = [v.strip().strip("\"'") for v in value[1:-1].split(",") if v.strip()]
+        meta[key] = value.strip("\"'") if isinstance(value, str) else value
+    return meta, text[match.end():]
+
+
+def read_markdown_dir(path):
+    """Yield a record per ``*.md`` file under ``path``, in name order."""
+    for file in sorted(path.rglob("*.md")):
+        meta, body = parse_front_matter(file.read_text(encoding="utf-8"))
+        title = meta.get("title")
+        if not title:
+            heading = re.match(r"\s*#\s+(.+)\n?", body)
+            if heading:
+                title, body = heading.group(1).strip(), body[heading.end():]
+            else:
+                title = file.stem.replace("-", " ").replace("_", " ")
+        yield {**meta, "title": title, "content": body.strip(), "source": str(file)}
+
+
+def read_jsonl(path):
+    with path.open(encoding="utf-8") as lines:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise InvalidRecord(f"{path}:{number}: {exc}") from exc
+            yield {**record, "source": f"{path}:{number}"}
+
+
+def _as_bool(value, default):
+    if value is None or value == "":
+        return default
+    return value if isinstance(value, bool) else str(value).strip().lower() in _TRUE
+
+
+def _as_list(value):
+    if not value:
+        return []
+    items = value if isinstance(value, list) else str(value).split(",")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def _as_datetime(value, source):
+    if not value:
+        return None
+    when = parse_datetime(str(value))
+    if when is None:
+        day = parse_date(str(value))
+        if day is None:
+            raise InvalidRecord(f"{source}: unreadable date {value!r}")
+        when = datetime.combine(day, dt_time())
+    return timezone.make_aware(when) if timezone.is_naive(when) else when
+
+
+# ── Import ───────────────────────────────────────────────────────────────────
+
+def _authors(batch, default, known):
+    wanted = {r["author"] for r in batch if r.get("author")} - known.keys()
+    if wanted:
+        known.update((u.username, u) for u in User.objects.filter(username__in=wanted))
+    for record in batch:
+        username = record.get("author")
+        if username and username not in known:
+            raise InvalidRecord(f"{record.get('source', 'record')}: unknown author {username!r}")
+        if not username and default is None:
+            raise InvalidRecord(f"{record.get('source', 'record')}: no author given")
+    return [known[r["author"]] if r.get("author") else default for r in batch]
+
+
+def _build(record, author, published):
+    source = record.get("source", "record")
+    title, content = str(record.get("title") or "").strip(), str(record.get("content") or "")
+    if not title or not content.strip():
+        raise InvalidRecord(f"{source}: title and content are required")
+    html = render_markdown(content)
+    excerpt = str(record.get("excerpt") or "").strip()
+    post = Post(
+        title=title[:200],
+        content=content,
+        content_html=html,
+        content_html_key=render_key(content),
+        excerpt=excerpt,
+        summary=excerpt or summarize(html),
+        author=author,
+        published=_as_bool(record.get("published"), published),
+    )
+    return post, _as_datetime(record.get("created_at") or record.get("date"), source), _as_list(record.get("tags"))
+
+
+def _write(batch, posts, dates, tag_names):
+    slugs = allocate_slugs([record.get("slug") or post.title for record, post in zip(batch, posts)])
+    for post, slug in zip(posts, slugs):
+        post.slug = slug
+    Post.objects.bulk_create(posts)
+    # auto_now_add stamps the insert time; bulk_update restores the
+    # archive dates. updated_at keeps the insert time, so export cursors
+    # and listing validators see the import as a change.
+    dated = []
+    for post, when in zip(posts, dates):
+        if when:
+            post.created_at = when
+            dated.append(post)
+    if dated:
+        Post.objects.bulk_update(dated, ["created_at"])
+
+    tags = upsert_tags({name for names in tag_names for name in names})
+    Through = Post.tags.through
+    links = {(post.pk, tags[name].pk) for post, names in zip(posts, tag_names) for name in names if name in tags}
+    Through.objects.bulk_create([Through(post_id=p, tag_id=t) for p, t in links])
+    published_ids = {post.pk for post in posts if post.published}
+    uses = Counter(tag_id for post_id, tag_id in links if post_id in published_ids)
+    by_delta = defaultdict(list)
+    for tag_id, n in uses.items():
+        by_delta[n].append(tag_id)
+    for n, tag_ids in by_delta.items():
+        counters.bump_tags(Tag.objects.filter(pk__in=tag_ids), n)
+    fragments.bump_tags(uses)
+
+
+def import_posts(records, author=None, published=False, batch_size=500, progress=None):
+    """Import ``records`` in batches; return ``(posts imported, seconds)``.
+
+    ``author`` is used for records without an ``author`` username and
+    ``published`` for records without a ``published`` flag. Each batch is
+    its own transaction. ``progress(imported, seconds)`` is called after
+    every batch.
+    """
+    started, imported = time.perf_counter(), 0
+    known, touched = {}, set()
+    records = iter(records)
+    try:
+        while batch := list(islice(records, batch_size)):
+            authors = _authors(batch, author, known)
+            built = [_build(r, a, published) for r, a in zip(batch, authors)]
+            posts, dates, tag_names = (list(column) for column in zip(*built))
+            for attempt in range(2):
+                try:
+                    with transaction.atomic():
+                        _write(batch, posts, dates, tag_names)
+                    break
+                except IntegrityError:
+                    # A slug was taken concurrently; allocate afresh once.
+                    if attempt:
+                        raise
+                    for post in posts:
+                        post.pk, post._state.adding = None, True
+            imported += len(posts)
+            touched.update(a.pk for a in authors)
+            if progress:
+                progress(imported, time.perf_counter() - started)
+    finally:
+        if touched:
+            activity.rebuild(User.objects.filter(pk__in=touched))
+            fragments.bump(fragments.FEED, *(fragments.author_key(pk) for pk in touched))
+    return imported, time.perf_counter() - started
@@ -0,0 +1,143 @@
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from blog.models import Post, Tag
+from blog.pagination import paginate
+
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+SQLITE_TABLE = re.compile(r"^(?:SCAN|SEARCH) (\w+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main pages, EXPLAIN every query they run and fail if any "
+        "scans or sorts a large table. Run it against a seeded database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="User to log in as (default: author of the newest post).")
+        parser.add_argument("--min-rows", type=int, default=1000,
+                            help="Scans and sorts of fewer rows than this are fine.")
+
+    def handle(self, *args, username, min_rows, verbosity, **options):
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(f"Query plans can only be checked on PostgreSQL or SQLite, not {connection.vendor}.")
+        post = Post.objects.filter(published=True).select_related("author").order_by("-created_at", "-id").first()
+        if post is None:
+            raise CommandError("No published posts; seed the database first (manage.py seed_inkwell).")
+        user = User.objects.get(username=username) if username else post.author
+        tag = Tag.objects.filter(post_count__gt=0).order_by("-post_count").first()
+        self.min_rows, self.table_rows = min_rows, {}
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")  # fresh statistics, e.g. straight after seeding
+
+        page_two = paginate(Post.objects.filter(published=True)).next_cursor
+        pages = {
+            "feed": ("/", True),
+            "feed page 2": (f"/?cursor={page_two}", True),
+            "own posts": ("/blog/", True),
+            "post detail": (f"/blog/{post.slug}/", True),
+            "profile": ("/user/profile/", True),
+            "public profile": (f"/user/{post.author.username}/", False),
+            "api post list": ("/blog/api/posts/", False),
+            "api post list page 2": (f"/blog/api/posts/?cursor={page_two}", False),
+            "api author posts": (f"/blog/api/posts/?author={post.author.username}", False),
+            "api post detail": (f"/blog/api/posts/{post.slug}/", False),
+            "api export": ("/blog/api/posts/export/", False),
+            "rss feed": ("/blog/feed/rss/", False),
+            "author atom feed": (f"/user/{post.author.username}/feed/atom/", False),
+            "api tag list": ("/blog/api/tags/", False),
+        }
+        if tag is not None:
+            pages["tag page"] = (f"/blog/tags/{tag.slug}/", False)
+            pages["api tag posts"] = (f"/blog/api/tags/{tag.slug}/", False)
+            pages["api tag search"] = (f"/blog/api/tags/search/?q={tag.slug[:2]}", False)
+        failures = 0
+        # Every fragment and page must be rendered, and every read must hit
+        # the database the plans are taken on.
+        with override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+            PAGE_CACHE_TIMEOUT=0, DATABASE_REPLICAS=[], ALLOWED_HOSTS=["testserver"],
+        ):
+            anonymous, logged_in = Client(), Client()
+            logged_in.force_login(user)
+            try:
+                for name, (path, authenticated) in pages.items():
+                    failures += self._check_page(name, path, logged_in if authenticated else anonymous, verbosity)
+            finally:
+                logged_in.logout()
+        if failures:
+            raise CommandError(f"{failures} quer{'y' if failures == 1 else 'ies'} scan or sort a large table.")
+        self.stdout.write(self.style.SUCCESS(f"All queries on {len(pages)} pages use an index."))
+
+    def _check_page(self, name, path, client, verbosity):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(f"{name}: GET {path} returned {response.status_code}.")
+        failures = 0
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        for sql in dict.fromkeys(selects):
+            plan, problems = self._explain(sql)
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"{name}: {'; '.join(problems)}"))
+            if problems or verbosity >= 2:
+                self.stdout.write(f"  {sql}\n  {plan}".replace("\n", "\n  ") + "\n")
+        if not failures and verbosity >= 1:
+            self.stdout.write(f"{name}: {len(selects)} queries OK")
+        return failures
+
+    def _explain(self, sql):
+        """Return ``(plan text, problems)`` for one query."""
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                return json.dumps(plan[0]["Plan"], indent=1), list(self._postgres_problems(plan[0]["Plan"]))
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            details = [row[3] for row in cursor.fetchall()]
+        return "\n".join(details), list(self._sqlite_problems(details))
+
+    def _postgres_problems(self, node):
+        kind = node["Node Type"]
+        if kind == "Seq Scan" and self._rows(node["Relation Name"]) >= self.min_rows:
+            yield f"sequential scan of {node['Relation Name']}"
+        if kind in ("Sort", "Incremental Sort"):
+            rows = sum(child["Plan Rows"] for child in node.get("Plans", []))
+            if rows >= self.min_rows:
+                yield f"sort of ~{rows} rows"
+        for child in node.get("Plans", []):
+            yield from self._postgres_problems(child)
+
+    def _sqlite_problems(self, details):
+        tables = [m.group(1) for m in map(SQLITE_TABLE.match, details) if m]
+        for detail in details:
+            scan = SQLITE_SCAN.match(detail)
+            if scan and self._rows(scan.group(1)) >= self.min_rows:
+                yield f"full scan of {scan.group(1)}"
+            if detail.startswith("USE TEMP B-TREE") and any(self._rows(t) >= self.min_rows for t in tables):
+                yield detail.lower().replace("use temp b-tree", "sort")
+
+    def _rows(self, table):
+        if table not in self.table_rows:
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql":
+                    cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [table])
+                else:
+                    if table not in connection.introspection.table_names(cursor):
+                        return 0  # an alias or a subquery, not a table
+                    cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                row = cursor.fetchone()
+            self.table_rows[table] = int(row[0]) if row else 0
+        return self.table_rows[table]
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.importing import InvalidRecord, import_posts, read_jsonl, read_markdown_dir
+
+
+class Command(BaseCommand):
+    help = "Import posts from a directory of Markdown files with front matter, or from a JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", type=Path, help="A directory of *.md files or a .jsonl file.")
+        parser.add_argument("--author", help="Username for records that do not name an author.")
+        parser.add_argument("--published", action="store_true", help="Publish records without a published flag.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, source, author, published, batch_size, **options):
+        if source.is_dir():
+            records = read_markdown_dir(source)
+        elif source.is_file():
+            records = read_jsonl(source)
+        else:
+            raise CommandError(f"{source} does not exist.")
+        default_author = None
+        if author:
+            default_author = User.objects.filter(username=author).first()
+            if default_author is None:
+                raise CommandError(f"No user named {author!r}.")
+
+        def progress(n, seconds):
+            self.stdout.write(f"  {n} posts, {n / seconds:.0f} posts/s")
+
+        try:
+            n, seconds = import_posts(records, default_author, published, batch_size, progress)
+        except InvalidRecord as exc:
+            raise CommandError(f"{exc} (earlier batches were kept)") from exc
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {n} posts in {seconds:.1f}s ({n / seconds if seconds else 0:.0f} posts/s)."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog import counters
+from user import activity
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized counters (comments, tag usage, author totals) to repair drift."
+
+    def handle(self, *args, **options):
+        counters.recount()
+        activity.rebuild()
+        self.stdout.write(self.style.SUCCESS("Counters recomputed."))
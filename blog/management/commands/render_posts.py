@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = "Backfill or re-render the stored Markdown HTML of posts in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Re-render every post, not only those whose stored HTML is stale.",
+        )
+
+    def handle(self, *args, batch_size, force, **options):
+        qs = Post.objects.only("id", "content", "content_html_key").order_by("id")
+        seen = rendered = 0
+        batch = []
+        for post in qs.iterator(chunk_size=batch_size):
+            seen += 1
+            if post.refresh_content_html(force=force):
+                batch.append(post)
+            if len(batch) >= batch_size:
+                rendered += self._flush(batch)
+        rendered += self._flush(batch)
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} of {seen} posts."))
+
+    @staticmethod
+    def _flush(batch):
+        # bulk_update leaves updated_at alone: re-rendering is not an edit.
+        Post.objects.bulk_update(batch, ["content_html", "content_html_key"])
+        n = len(batch)
+        batch.clear()
+        return n
@@ -0,0 +1,181 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from blog import counters, fragments
+from blog.models import Comment, Post, Tag
+from blog.rendering import render_key, render_markdown, summarize
+from user import activity
+
+WORDS = (
+    "the a of to and in is it that for on with as was at by this be from or have an are not "
+    "writing draft essay notes idea story reader editor page chapter outline memory morning "
+    "coffee city river garden winter summer travel train letter library quiet light shadow "
+    "code python django query index cache server latency deploy bug test build release "
+    "design pattern habit focus practice lesson mistake review question answer simple small"
+).split()
+TAG_NAMES = (
+    "python django postgres caching performance writing travel books productivity design "
+    "testing devops career learning music photography food cities notes tutorial opinion "
+    "javascript css security databases linux history science poetry fiction review"
+).split()
+LANGUAGES = ("python", "sql", "bash", "javascript")
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate synthetic users, posts, tags and comments for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--tags", type=int, default=len(TAG_NAMES))
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=365, help="Spread creation dates over this many days.")
+        parser.add_argument("--published-ratio", type=float, default=0.85)
+        parser.add_argument("--password", default="inkwell-bench", help="Password for every seeded user.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable data sets.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        self.rng = random.Random(opts["seed"])
+        self.now = timezone.now()
+        self.days = opts["days"]
+        self.batch_size = opts["batch_size"]
+        with transaction.atomic():
+            users = self._users(opts["users"], opts["password"])
+            tags = self._tags(opts["tags"])
+            posts = self._posts(opts["posts"], users, tags, opts["published_ratio"])
+            self._comments(opts["comments"], users, posts)
+            # bulk_create bypasses the signals that maintain these.
+            counters.recount()
+            activity.rebuild(users)
+        fragments.bump(fragments.FEED, fragments.TAGS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(tags)} tags, {len(posts)} posts and {opts['comments']} comments. "
+            f"Seeded users are {users[0].username}..{users[-1].username} with password {opts['password']!r}."
+            if users else "Nothing to seed."
+        ))
+
+    # ── Generators ───────────────────────────────────────────────────────────
+
+    def _when(self):
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 24 * 3600))
+
+    def _sentence(self, low=6, high=18):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return " ".join(words).capitalize() + "."
+
+    def _paragraph(self):
+        text = " ".join(self._sentence() for _ in range(self.rng.randint(2, 6)))
+        # Sprinkle inline Markdown the way real posts do.
+        words = text.split(" ")
+        for _ in range(self.rng.randint(0, 3)):
+            i = self.rng.randrange(len(words))
+            words[i] = self.rng.choice(("**{}**", "*{}*", "`{}`", "[{}](https://example.com)")).format(words[i])
+        return " ".join(words)
+
+    def _markdown(self):
+        blocks = [self._paragraph()]
+        for _ in range(self.rng.randint(2, 8)):
+            kind = self.rng.random()
+            if kind < 0.15:
+                blocks.append(f"## {self._sentence(2, 6).rstrip('.')}")
+            elif kind < 0.3:
+                blocks.append("\n".join(f"- {self._sentence(3, 8)}" for _ in range(self.rng.randint(2, 5))))
+            elif kind < 0.4:
+                lines = "\n".join(
+                    f"{self.rng.choice(WORDS)} = {self.rng.randint(0, 999)}" for _ in range(self.rng.randint(2, 8))
+                )
+                blocks.append(f"```{self.rng.choice(LANGUAGES)}\n{lines}\n```")
+            elif kind < 0.45:
+                blocks.append(f"> {self._sentence()}")
+            elif kind < 0.5:
+                rows = "\n".join(
+                    f"| {self.rng.choice(WORDS)} | {self.rng.randint(1, 100)} |" for _ in range(self.rng.randint(2, 5))
+                )
+                blocks.append(f"| Item | Count |\n| --- | --- |\n{rows}")
+            else:
+                blocks.append(self._paragraph())
+        return "\n\n".join(blocks)
+
+    # ── Tables ───────────────────────────────────────────────────────────────
+
+    def _users(self, n, password):
+        start = User.objects.filter(username__startswith="seed").count()
+        hashed = make_password(password)  # hashing once keeps large runs fast
+        users = [
+            User(username=f"seed{i}", password=hashed, date_joined=self.now - timedelta(days=self.days))
+            for i in range(start, start + n)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def _tags(self, n):
+        names = TAG_NAMES[:n] + [f"topic-{i}" for i in range(max(0, n - len(TAG_NAMES)))]
+        existing = set(Tag.objects.filter(name__in=names).values_list("name", flat=True))
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slugify(name)) for name in names if name not in existing],
+            batch_size=self.batch_size,
+        )
+        return list(Tag.objects.filter(name__in=names))
+
+    def _posts(self, n, users, tags, published_ratio):
+        if not users:
+            return []
+        start = (Post.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        posts = []
+        for i in range(n):
+            title = self._sentence(3, 9).rstrip(".")
+            content = self._markdown()
+            html = render_markdown(content)
+            excerpt = self._sentence() if self.rng.random() < 0.3 else ""
+            posts.append(Post(
+                title=title,
+                slug=f"{slugify(title)[:40]}-{start + i}",
+                content=content,
+                content_html=html,
+                content_html_key=render_key(content),
+                excerpt=excerpt,
+                summary=excerpt or summarize(html),
+                author=self.rng.choice(users),
+                published=self.rng.random() < published_ratio,
+            ))
+        posts = Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        # auto_now_add/auto_now stamp every row with the insert time;
+        # bulk_update then spreads the creation dates out. updated_at keeps
+        # the insert time, so export cursors and listing validators see the
+        # seeded posts as a change.
+        for post in posts:
+            post.created_at = self._when()
+        Post.objects.bulk_update(posts, ["created_at"], batch_size=self.batch_size)
+
+        if tags:
+            Through = Post.tags.through
+            Through.objects.bulk_create(
+                [Through(post_id=post.pk, tag_id=tag.pk)
+                 for post in posts for tag in self.rng.sample(tags, self.rng.randint(0, min(4, len(tags))))],
+                batch_size=self.batch_size,
+            )
+        return posts
+
+    def _comments(self, n, users, posts):
+        if not (users and posts):
+            return
+        comments = [
+            Comment(
+                post=self.rng.choice(posts),
+                author=self.rng.choice(users),
+                body=" ".join(self._sentence(4, 20) for _ in range(self.rng.randint(1, 3))),
+                approved=self.rng.random() < 0.9,
+            )
+            for _ in range(n)
+        ]
+        comments = Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        for comment in comments:
+            comment.created_at = comment.post.created_at + (self.now - comment.post.created_at) * self.rng.random()
+        Comment.objects.bulk_update(comments, ["created_at"], batch_size=self.batch_size)
@@ -0,0 +1,273 @@
+"""Per-request timings and per-view latency histograms.
+
+With METRICS_ENABLED on, ``RequestMetricsMiddleware`` opens a collector for
+each request. Database queries (through a connection execute wrapper),
+template renders (through ``InstrumentedDjangoTemplates``) and Markdown
+renders (``timed("markdown")`` in ``blog.rendering``) add to it, and the
+totals go out in a ``Server-Timing`` header. Durations are also aggregated
+per URL name in this process and, every METRICS_FLUSH_SECONDS, copied to the
+cache so ``/metrics`` can report every worker in Prometheus text format.
+
+Disabled, the middleware removes itself from the stack and the hooks find
+no collector, so they cost one context-variable lookup.
+"""
+import bisect
+import ipaddress
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.urls import Resolver404, resolve
+
+# Upper bounds in seconds, as in the Prometheus client defaults.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Server-Timing metric name -> description, for each timed component.
+COMPONENTS = {"db": "Database", "template": "Templates", "markdown": "Markdown"}
+
+_current = ContextVar("request_timings", default=None)
+_WORKER = uuid.uuid4().hex
+_WORKERS_KEY = "metrics:workers"
+
+
+class RequestTimings:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, name, seconds):
+        self.seconds[name] += seconds
+        self.counts[name] += 1
+
+    def server_timing(self, total):
+        entries = []
+        for name, label in COMPONENTS.items():
+            if name in self.counts:
+                desc = f"{self.counts[name]} {'queries' if name == 'db' else 'renders'}"
+                entries.append(f'{name};dur={self.seconds[name] * 1000:.1f};desc="{label}, {desc}"')
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def timed(name):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", time.perf_counter() - start)
+
+
+def install_query_timer(connection, **kwargs):
+    """Add the query timer to ``connection`` (a ``connection_created`` receiver)."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class _TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with top-level renders timed."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ── Aggregation ──────────────────────────────────────────────────────────────
+
+def _empty_series():
+    return {
+        "buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0,
+        "seconds": defaultdict(float), "calls": defaultdict(int),
+    }
+
+
+class _Registry:
+    """Per-process totals, keyed by ``(view, method)``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.flushed_at = 0.0
+
+    def observe(self, view, method, total, timings):
+        with self.lock:
+            s = self.series.setdefault((view, method), _empty_series())
+            i = bisect.bisect_left(BUCKETS, total)
+            if i < len(BUCKETS):
+                s["buckets"][i] += 1
+            s["count"] += 1
+            s["sum"] += total
+            for name, seconds in timings.seconds.items():
+                s["seconds"][name] += seconds
+                s["calls"][name] += timings.counts[name]
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {**s, "seconds": dict(s["seconds"]), "calls": dict(s["calls"]),
+                      "buckets": list(s["buckets"])}
+                for key, s in self.series.items()
+            }
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed_at < settings.METRICS_FLUSH_SECONDS:
+            return
+        self.flushed_at = now
+        cache.set(f"metrics:{_WORKER}", self.snapshot(), timeout=60 * 60 * 24)
+        workers = cache.get(_WORKERS_KEY, set())
+        if _WORKER not in workers:
+            cache.set(_WORKERS_KEY, workers | {_WORKER}, timeout=None)
+
+
+registry = _Registry()
+
+
+def _view_name(request):
+    match = request.resolver_match
+    if match is None:
+        # Answered before URL resolution, e.g. by the page cache.
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return "<unmatched>"
+    return match.view_name
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all():
+            install_query_timer(connection)
+        timings, start = RequestTimings(), time.perf_counter()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings, start = RequestTimings(), time.perf_counter()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        # Flushing writes to the cache, so it runs off the event loop.
+        return await sync_to_async(self._finish)(request, response, timings, time.perf_counter() - start)
+
+    @staticmethod
+    def _finish(request, response, timings, total):
+        response["Server-Timing"] = timings.server_timing(total)
+        registry.observe(_view_name(request), request.method, total, timings)
+        registry.flush()
+        return response
+
+
+# ── Exposition ───────────────────────────────────────────────────────────────
+
+def _merged():
+    """Sum the snapshots of every worker that has flushed recently."""
+    registry.flush(force=True)
+    workers = cache.get(_WORKERS_KEY, set())
+    merged = {}
+    for snapshot in cache.get_many([f"metrics:{w}" for w in workers]).values():
+        for key, s in snapshot.items():
+            m = merged.setdefault(key, _empty_series())
+            m["buckets"] = [a + b for a, b in zip(m["buckets"], s["buckets"])]
+            m["count"] += s["count"]
+            m["sum"] += s["sum"]
+            for name, seconds in s["seconds"].items():
+                m["seconds"][name] += seconds
+                m["calls"][name] += s["calls"][name]
+    return merged
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+def prometheus_text():
+    series = sorted(_merged().items())
+    lines = [
+        "# HELP inkwell_request_duration_seconds Time spent answering requests, by URL name.",
+        "# TYPE inkwell_request_duration_seconds histogram",
+    ]
+    for (view, method), s in series:
+        labels = _labels(view=view, method=method)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, s["buckets"]):
+            cumulative += n
+            bucket = _labels(view=view, method=method, le=bound)
+            lines.append(f"inkwell_request_duration_seconds_bucket{{{bucket}}} {cumulative}")
+        bucket = _labels(view=view, method=method, le="+Inf")
+        lines.append(f"inkwell_request_duration_seconds_bucket{{{bucket}}} {s['count']}")
+        lines.append(f"inkwell_request_duration_seconds_sum{{{labels}}} {s['sum']}")
+        lines.append(f"inkwell_request_duration_seconds_count{{{labels}}} {s['count']}")
+    for name, label in COMPONENTS.items():
+        lines += [
+            f"# HELP inkwell_{name}_seconds_total {label} time spent inside requests, by URL name.",
+            f"# TYPE inkwell_{name}_seconds_total counter",
+        ]
+        lines += [f"inkwell_{name}_seconds_total{{{_labels(view=view, method=method)}}} {s['seconds'].get(name, 0.0)}"
+                  for (view, method), s in series]
+        unit = "queries" if name == "db" else "renders"
+        lines += [
+            f"# HELP inkwell_{name}_{unit}_total {label} {unit} inside requests, by URL name.",
+            f"# TYPE inkwell_{name}_{unit}_total counter",
+        ]
+        lines += [f"inkwell_{name}_{unit}_total{{{_labels(view=view, method=method)}}} {s['calls'].get(name, 0)}"
+                  for (view, method), s in series]
+    return "\n".join(lines) + "\n"
+
+
+def is_internal(request):
+    """True when the client address is in METRICS_ALLOWED_NETWORKS."""
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(net) for net in settings.METRICS_ALLOWED_NETWORKS)
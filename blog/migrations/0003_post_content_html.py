@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_tag_post_excerpt_post_slug_post_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html_key',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# The column and index are PostgreSQL-only and invisible to the ORM; blog.search
+# queries them with raw SQL. On SQLite, blog.search.install_sqlite_index sets up
+# an FTS5 table instead after every migrate.
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')"
+)
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE blog_post ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+    )
+    schema_editor.execute("CREATE INDEX blog_post_search_idx ON blog_post USING gin (search_vector)")
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS blog_post_search_idx")
+    schema_editor.execute("ALTER TABLE blog_post DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_deletedpost'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    Comment = apps.get_model('blog', 'Comment')
+    comments = (Comment.objects.filter(post=OuterRef('pk'), approved=True).order_by()
+                .values('post').annotate(n=Count('pk')).values('n'))
+    posts = (Post.objects.filter(tags=OuterRef('pk'), published=True).order_by()
+             .values('tags').annotate(n=Count('pk')).values('n'))
+    Post.objects.update(comment_count=Coalesce(Subquery(comments), Value(0)))
+    Tag.objects.update(post_count=Coalesce(Subquery(posts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:58
+
+import html
+
+import markdown
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+def backfill(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'excerpt', 'content', 'content_html').iterator(chunk_size=500):
+        rendered = post.content_html or markdown.markdown(post.content, extensions=['fenced_code', 'tables', 'nl2br'])
+        text = ' '.join(html.unescape(strip_tags(rendered)).split())
+        post.summary = post.excerpt.strip() or Truncator(text).chars(160)
+        batch.append(post)
+        if len(batch) == 500:
+            Post.objects.bulk_update(batch, ['summary'])
+            batch = []
+    Post.objects.bulk_update(batch, ['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_comment_count_tag_post_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='summary',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,16 @@
-import markdown as md
-
 from django.contrib.auth.models import User
 from django.db import models
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 
+from .rendering import render_key, render_markdown, summarize
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, blank=True)
+    # Published posts with this tag; maintained by blog.signals.
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -19,29 +21,103 @@ class Tag(models.Model):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Skip the body columns, which listings never display."""
+        return self.defer("content", "content_html", "content_html_key")
+
+
+# Paths under /blog/ that a post slug would collide with (blog/urls.py).
+RESERVED_SLUGS = frozenset({"api", "feed", "new", "preview", "search", "tags"})
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
     content = models.TextField()
+    # Pre-rendered Markdown, valid while content_html_key == render_key(content).
+    content_html = models.TextField(blank=True, editable=False)
+    content_html_key = models.CharField(max_length=64, blank=True, editable=False)
     excerpt = models.TextField(blank=True)
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The excerpt, or the start of the post as plain text when it is blank.
+    summary = models.TextField(blank=True, editable=False)
+    # Indexed by blog_post_author_idx, which starts with author.
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     tags = models.ManyToManyField(Tag, blank=True, related_name="posts")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published = models.BooleanField(default=False)
+    # Approved comments; maintained by blog.signals.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Every listing is keyset-paginated newest first over
+            # (created_at, id); see blog.pagination.
+            models.Index(fields=["-created_at", "-id"], condition=models.Q(published=True),
+                         name="blog_post_feed_idx"),
+            models.Index(fields=["author", "-created_at", "-id"], name="blog_post_author_idx"),
+            # The API export stream and posts_changed_at().
+            models.Index(fields=["updated_at", "id"], name="blog_post_updated_idx"),
+            models.Index(fields=["created_at"], name="blog_post_created_idx"),
+        ]
 
-    def save(self, *args, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save receivers tell a publish/unpublish from other edits.
+        instance.published_was = instance.__dict__.get("published")
+        return instance
+
+    def save(self, *args, render=True, **kwargs):
+        """``render=False`` leaves changed Markdown to blog.tasks.render_post."""
         if not self.slug:
             self.slug = slugify(self.title)
+            if self.slug in RESERVED_SLUGS:
+                self.slug = f"{self.slug}-1"
+        if render:
+            self.refresh_content_html()
+        elif self.content_html_key != render_key(self.content):
+            # Blank until the task runs, so readers render on demand rather
+            # than trust the old HTML.
+            self.content_html_key = ""
+        if self.excerpt.strip() or self.content_html_key:
+            self.summary = self.excerpt.strip() or summarize(self.content_html)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"content", "excerpt"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "content_html", "content_html_key", "summary"}
         super().save(*args, **kwargs)
+        self.published_was = self.published
+
+    def refresh_content_html(self, force=False):
+        """Re-render content_html if it is stale. Returns True if it changed."""
+        key = render_key(self.content)
+        if not force and key == self.content_html_key:
+            return False
+        self.content_html = render_markdown(self.content)
+        self.content_html_key = key
+        return True
 
     def get_content_html(self):
-        return mark_safe(
-            md.markdown(self.content, extensions=["fenced_code", "tables", "nl2br"])
-        )
+        if self.refresh_content_html():
+            # Stored HTML predates the current renderer config; persist the
+            # new rendering without touching updated_at.
+            Post.objects.filter(pk=self.pk).update(
+                content_html=self.content_html,
+                content_html_key=self.content_html_key,
+            )
+        return mark_safe(self.content_html)
+
+    async def aget_content_html(self):
+        if self.refresh_content_html():
+            await Post.objects.filter(pk=self.pk).aupdate(
+                content_html=self.content_html,
+                content_html_key=self.content_html_key,
+            )
+        return mark_safe(self.content_html)
 
     def __str__(self):
         return self.title
@@ -56,6 +132,38 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # The admin changelist: ordered by date, optionally filtered to
+            # the approved or pending ones.
+            models.Index(fields=["created_at"], name="blog_comment_created_idx"),
+            models.Index(fields=["approved", "created_at"], name="blog_comment_approved_idx"),
+            # A post's visible thread, its count and its newest comment;
+            # threads are keyset-paginated over (created_at, id).
+            models.Index(fields=["post", "created_at", "id"], condition=models.Q(approved=True),
+                         name="blog_comment_thread_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.approved_was = instance.__dict__.get("approved")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.approved_was = self.approved
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
+
+
+class DeletedPost(models.Model):
+    """Tombstone for a deleted published post, so API mirrors can drop it."""
+    post_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["deleted_at", "id"]
+
+    def __str__(self):
+        return f"Post {self.post_id} deleted {self.deleted_at:%Y-%m-%d}"
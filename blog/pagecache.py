@@ -0,0 +1,155 @@
+"""Full-response cache for anonymous readers.
+
+Views opt in by tagging their response with surrogate keys (``tag``). For
+requests without a session cookie, ``AnonymousPageCacheMiddleware`` stores
+tagged 200 responses gzip-compressed, together with their headers and the
+current stamp of every key, and replays them before sessions, CSRF or the
+ORM are touched. The keys are the version stamps of ``blog.fragments``, so
+the signals that invalidate fragments also purge exactly the pages that
+showed the changed rows. ``X-Cache`` reports HIT, MISS or BYPASS.
+
+Off unless PAGE_CACHE_TIMEOUT is set.
+"""
+import gzip
+import hashlib
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from . import fragments
+
+SURROGATE_KEY_HEADER = "Surrogate-Key"
+# Every header the inner stack set is replayed on hits, security headers
+# such as X-Frame-Options included, except these, which describe one
+# particular response. Cookies live apart from the headers and are never
+# stored.
+UNSTORED_HEADERS = {"content-length", "content-encoding", "x-cache"}
+# Cookies that can change what an otherwise anonymous page shows.
+_PERSONAL_COOKIES = (settings.SESSION_COOKIE_NAME, "messages")
+_ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def tag(response, *keys):
+    """Mark ``response`` as cacheable for anonymous readers under ``keys``."""
+    response[SURROGATE_KEY_HEADER] = " ".join(keys)
+    return response
+
+
+def _cache_key(request):
+    url = request.build_absolute_uri()
+    return "page:" + hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+
+
+def _storable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and SURROGATE_KEY_HEADER in response
+        and not response.cookies
+        and "private" not in response.get("Cache-Control", "")
+    )
+
+
+def _replay(request, entry):
+    headers = entry["headers"]
+    response = get_conditional_response(
+        request,
+        etag=headers.get("ETag"),
+        last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+    )
+    if response is None:
+        if _ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")):
+            response = HttpResponse(entry["body"])
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(gzip.decompress(entry["body"]))
+        response["Content-Length"] = len(response.content)
+    for name, value in headers.items():
+        # A 304 carries no body, so it has no Content-Type to restore.
+        if response.status_code != 304 or name.lower() != "content-type":
+            response[name] = value
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def _bypass(request):
+    return request.method not in ("GET", "HEAD") or any(c in request.COOKIES for c in _PERSONAL_COOKIES)
+
+
+def _lookup(request):
+    """Return ``(cache_key, replayed_response_or_None)``."""
+    key = _cache_key(request)
+    entry = cache.get(key)
+    if entry and fragments.versions(*entry["keys"]) == entry["keys"]:
+        response = _replay(request, entry)
+        response["X-Cache"] = "HIT"
+        return key, response
+    return key, None
+
+
+def _store(key, response, started, created):
+    """Cache ``response`` unless one of its stamps was bumped after ``started``.
+
+    The keys are only known once the response exists, so the stamps are read
+    after rendering. A stamp is the ``time.time_ns()`` of its last bump,
+    though, so one newer than the render's start, and not merely ``created``
+    during it, means a write landed while the page was being built.
+    """
+    if _storable(response):
+        stamps = fragments.versions(*response[SURROGATE_KEY_HEADER].split())
+        if all(stamp <= started or created.get(name) == stamp for name, stamp in stamps.items()):
+            cache.set(key, {
+                "keys": stamps,
+                "headers": {name: value for name, value in response.items()
+                            if name.lower() not in UNSTORED_HEADERS},
+                "body": gzip.compress(response.content),
+            }, settings.PAGE_CACHE_TIMEOUT)
+    response["X-Cache"] = "MISS"
+    return response
+
+
+class AnonymousPageCacheMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.PAGE_CACHE_TIMEOUT:
+            return self.get_response(request)
+        if _bypass(request):
+            response = self.get_response(request)
+            response["X-Cache"] = "BYPASS"
+            return response
+        key, response = _lookup(request)
+        if response is None:
+            with fragments.created() as created:
+                started = time.time_ns()
+                response = _store(key, self.get_response(request), started, created)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.PAGE_CACHE_TIMEOUT:
+            return await self.get_response(request)
+        if _bypass(request):
+            response = await self.get_response(request)
+            response["X-Cache"] = "BYPASS"
+            return response
+        key, response = await sync_to_async(_lookup)(request)
+        if response is None:
+            with fragments.created() as created:
+                started = time.time_ns()
+                response = await self.get_response(request)
+                response = await sync_to_async(_store)(key, response, started, created)
+        return response
@@ -0,0 +1,157 @@
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def pack_cursor(payload):
+    """Encode a JSON-serialisable list as an opaque, URL-safe cursor."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in payload]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def unpack_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(payload, list):
+        raise InvalidCursor(cursor)
+    return payload
+
+
+def encode_cursor(values, reverse=False):
+    return pack_cursor([*values, "p" if reverse else "n"])
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, id, reverse)`` for a cursor made by encode_cursor."""
+    try:
+        stamp, pk, direction = unpack_cursor(cursor)
+        return datetime.fromisoformat(stamp), int(pk), direction == "p"
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def page_size(value=None):
+    """Clamp a requested page size to POSTS_MAX_PAGE_SIZE."""
+    try:
+        size = int(value) if value else settings.POSTS_PAGE_SIZE
+    except ValueError:
+        size = settings.POSTS_PAGE_SIZE
+    return max(1, min(size, settings.POSTS_MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def _page_rows(qs, cursor, size, field):
+    """The ``size + 1`` rows query for a page, and whether it walks backwards."""
+    reverse = False
+    if cursor:
+        stamp, pk, reverse = decode_cursor(cursor)
+        if reverse:
+            qs = qs.filter(Q(**{f"{field}__gt": stamp}) | Q(**{field: stamp, "id__gt": pk}))
+        else:
+            qs = qs.filter(Q(**{f"{field}__lt": stamp}) | Q(**{field: stamp, "id__lt": pk}))
+    order = (field, "id") if reverse else (f"-{field}", "-id")
+    return qs.order_by(*order)[:size + 1], reverse
+
+
+def _make_page(rows, cursor, size, field, reverse):
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if reverse:
+        rows.reverse()
+    has_next = True if reverse else has_more
+    has_prev = has_more if reverse else bool(cursor)
+    if not rows:
+        return KeysetPage(rows)
+    first, last = rows[0], rows[-1]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor([getattr(last, field), last.id]) if has_next else None,
+        prev_cursor=encode_cursor([getattr(first, field), first.id], reverse=True) if has_prev else None,
+    )
+
+
+def paginate(qs, cursor=None, size=None, field="created_at"):
+    """Keyset-paginate ``qs`` newest first over ``(field, id)``.
+
+    Only ``size + 1`` rows are fetched per page, however deep the cursor is,
+    and no COUNT is issued.
+    """
+    size = size or page_size()
+    rows, reverse = _page_rows(qs, cursor, size, field)
+    return _make_page(list(rows), cursor, size, field, reverse)
+
+
+async def apaginate(qs, cursor=None, size=None, field="created_at"):
+    """Async version of ``paginate``."""
+    size = size or page_size()
+    rows, reverse = _page_rows(qs, cursor, size, field)
+    return _make_page([row async for row in rows], cursor, size, field, reverse)
+
+
+def paginate_request(request, qs, size=None):
+    """Paginate ``qs`` from the request's ``?cursor=``; a bad cursor is a 400."""
+    try:
+        return paginate(qs, request.GET.get("cursor"), size)
+    except InvalidCursor:
+        raise BadRequest("Invalid cursor.")
+
+
+def estimate_count(qs):
+    """Planner row estimate on PostgreSQL; exact COUNT elsewhere."""
+    connection = connections[qs.db]
+    if connection.vendor != "postgresql":
+        return qs.count()
+    sql, params = qs.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists over large tables.
+
+    On PostgreSQL the page count comes from the planner estimate; tables
+    estimated under ``exact_below`` rows are small enough to COUNT exactly.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if connections[qs.db].vendor == "postgresql":
+            estimate = estimate_count(qs)
+            if estimate >= self.exact_below:
+                return estimate
+        return super().count
@@ -0,0 +1,33 @@
+import hashlib
+import html
+
+import markdown as md
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from .metrics import timed
+
+# Bump RENDERER_VERSION whenever the Markdown output for unchanged content
+# would differ (new extension, extension config, library upgrade). Stored
+# HTML keyed on an older version is re-rendered the next time it is needed.
+RENDERER_VERSION = 1
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "nl2br"]
+
+
+def render_markdown(text):
+    with timed("markdown"):
+        return md.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+
+
+def render_key(text):
+    """Identify a rendering of ``text`` by content hash and renderer config."""
+    h = hashlib.sha256()
+    h.update(f"v{RENDERER_VERSION}:{','.join(MARKDOWN_EXTENSIONS)}:{md.__version__}\n".encode())
+    h.update(text.encode())
+    return h.hexdigest()
+
+
+def summarize(rendered_html, length=160):
+    """Plain-text opening of a rendered post, for listings."""
+    text = " ".join(html.unescape(strip_tags(rendered_html)).split())
+    return Truncator(text).chars(length)
@@ -0,0 +1,94 @@
+"""Full-text search over posts.
+
+PostgreSQL keeps a weighted ``tsvector`` in a generated ``search_vector``
+column with a GIN index (migration 0005). SQLite, used by the test settings,
+gets an external-content FTS5 table kept in sync by triggers, installed by a
+post_migrate hook. Either way the database maintains the index itself, so
+bulk inserts and queryset updates are covered too.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+POST_TABLE = Post._meta.db_table
+FTS_TABLE = f"{POST_TABLE}_fts"
+
+# Title matches outrank excerpt matches, which outrank body matches
+# (mirrors the A/B/C weights of the PostgreSQL search_vector).
+_FTS_WEIGHTS = "10.0, 5.0, 1.0"
+_FTS_TRIGGERS = [f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"]
+
+_SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, excerpt, content, content='{POST_TABLE}', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, excerpt, content) "
+    f"VALUES (new.id, new.title, new.excerpt, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, excerpt, content) "
+    f"VALUES ('delete', old.id, old.title, old.excerpt, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, excerpt, content) "
+    f"VALUES ('delete', old.id, old.title, old.excerpt, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, excerpt, content) "
+    f"VALUES (new.id, new.title, new.excerpt, new.content); END",
+]
+
+
+def install_sqlite_index(connection):
+    """Create the FTS5 table and triggers if missing, rebuilding if needed.
+
+    SQLite drops triggers whenever Django rebuilds ``blog_post`` during an
+    ALTER, so this runs after every ``migrate`` rather than once.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            _FTS_TRIGGERS,
+        )
+        intact = cursor.fetchone()[0] == len(_FTS_TRIGGERS)
+        for statement in _SQLITE_SCHEMA:
+            cursor.execute(statement)
+        if not intact:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts5_query(query):
+    # Quote every word so user input can never be parsed as FTS5 syntax.
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+
+def search_posts(queryset, query):
+    """Filter ``queryset`` to posts matching ``query``, best match first.
+
+    Each post is annotated with ``rank``; higher is better on every backend.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        tsquery = "websearch_to_tsquery('english', %s)"
+        return (queryset
+                .filter(RawSQL(f"{POST_TABLE}.search_vector @@ {tsquery}", [query],
+                               output_field=BooleanField()))
+                .annotate(rank=RawSQL(f"ts_rank({POST_TABLE}.search_vector, {tsquery})", [query],
+                                      output_field=FloatField()))
+                .order_by("-rank", "-created_at"))
+    if vendor == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return queryset.none()
+        # bm25() is lower-is-better, so negate it.
+        return (queryset
+                .filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+                .annotate(rank=RawSQL(
+                    f"SELECT -bm25({FTS_TABLE}, {_FTS_WEIGHTS}) FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {POST_TABLE}.id",
+                    [match], output_field=FloatField()))
+                .order_by("-rank", "-created_at"))
+    return (queryset
+            .filter(Q(title__icontains=query) | Q(content__icontains=query))
+            .annotate(rank=Value(0.0, output_field=FloatField()))
+            .order_by("-created_at"))
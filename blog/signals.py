@@ -0,0 +1,150 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters, fragments
+from .models import Comment, DeletedPost, Post, Tag
+
+
+@receiver(post_delete, sender=Post)
+def record_deleted_post(sender, instance, **kwargs):
+    if instance.published:
+        DeletedPost.objects.create(post_id=instance.pk)
+
+
+# ── Counters ─────────────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Post)
+def count_publish_change(sender, instance, created, **kwargs):
+    # New posts have no tags yet; they are counted in count_tag_changes.
+    was = getattr(instance, "published_was", None)
+    if not created and was is not None and was != instance.published:
+        counters.bump_tags(Tag.objects.filter(posts=instance), 1 if instance.published else -1)
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    if getattr(instance, "published_was", instance.published):
+        counters.bump_tags(Tag.objects.filter(posts=instance), -1)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def count_tag_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    # With reverse=True, instance is a Tag and pk_set holds post ids.
+    if action in ("pre_clear", "pre_remove"):
+        # The rows are gone afterwards, so remember them now. remove()
+        # passes the ids it was given, linked or not; only links that
+        # exist are uncounted.
+        related = instance.posts if reverse else instance.tags
+        if action == "pre_remove":
+            related = related.filter(pk__in=pk_set)
+        instance._removed_pks = set(related.values_list("pk", flat=True))
+        return
+    if action in ("post_clear", "post_remove"):
+        pk_set, sign = instance.__dict__.pop("_removed_pks", set()), -1
+    elif action == "post_add":
+        # add() leaves out the ids that were already linked.
+        sign = 1
+    else:
+        return
+    if not pk_set:
+        return
+    if reverse:
+        n = Post.objects.filter(pk__in=pk_set, published=True).count()
+        counters.bump_tags(Tag.objects.filter(pk=instance.pk), sign * n)
+    elif instance.published:
+        counters.bump_tags(Tag.objects.filter(pk__in=pk_set), sign)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        delta = int(instance.approved)
+    else:
+        was = getattr(instance, "approved_was", None)
+        delta = 0 if was is None or was == instance.approved else (1 if instance.approved else -1)
+    if delta:
+        counters.bump_comments(instance.post_id, delta)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if getattr(instance, "approved_was", instance.approved):
+        counters.bump_comments(instance.post_id, -1)
+
+
+# ── Fragment cache ───────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, **kwargs):
+    fragments.bump_posts([instance.pk])
+    fragments.bump(fragments.author_key(instance.author_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_author(sender, instance, created, update_fields=None, **kwargs):
+    # Logging in saves just last_login; any other edit may be a rename.
+    if not created and (update_fields is None or "username" in update_fields):
+        fragments.bump(fragments.author_key(instance.pk))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_tag_list_fragments(sender, instance, action, reverse, pk_set, **kwargs):
+    # Clears are handled before the rows go, while they can still be listed.
+    if action == "pre_clear":
+        post_ids = instance.posts.values_list("pk", flat=True) if reverse else [instance.pk]
+    elif action in ("post_add", "post_remove"):
+        post_ids = pk_set if reverse else [instance.pk]
+    else:
+        return
+    fragments.bump_posts(post_ids, "tags")
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tagged_post_fragments(sender, instance, created=False, **kwargs):
+    if not created:
+        fragments.bump_posts(instance.posts.values_list("pk", flat=True), "tags")
+
+
+# A tag's pages and the tag cloud change when a published post gains or
+# loses the tag, and when the tag itself is renamed or deleted.
+
+@receiver(post_save, sender=Post)
+def invalidate_tags_on_publish_change(sender, instance, created, **kwargs):
+    was = getattr(instance, "published_was", None)
+    if not created and was is not None and was != instance.published:
+        fragments.bump_tags(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Post)
+def invalidate_tags_of_deleted_post(sender, instance, **kwargs):
+    if getattr(instance, "published_was", instance.published):
+        fragments.bump_tags(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_tag_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        tag_ids = [instance.pk] if reverse else instance.tags.values_list("pk", flat=True)
+    elif action in ("post_add", "post_remove"):
+        tag_ids = [instance.pk] if reverse else pk_set
+    else:
+        return
+    fragments.bump_tags(tag_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_renamed_tag(sender, instance, created=False, **kwargs):
+    if not created:
+        fragments.bump_tags([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_fragments(sender, instance, **kwargs):
+    # Pending comments are invisible until approved.
+    if instance.approved or getattr(instance, "approved_was", False):
+        fragments.bump_posts([instance.post_id], "comments")
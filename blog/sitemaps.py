@@ -0,0 +1,163 @@
+"""Sitemap index with fixed-size, separately cached shards.
+
+Each section lists one kind of public page. Rows are assigned to shards by
+id (``id // SHARD_SIZE``), so a row never moves between shards and a change
+only touches the shard that holds it. A shard is identified by the newest
+``updated_at`` and the number of published posts in its id range. That is
+one aggregate over an index range, and it serves as the ETag, so crawlers
+revalidate cheaply. A shard whose version changed is rebuilt by streaming
+its rows in id order; every other shard is served from the cache.
+
+The index is rebuilt only when ``posts_changed_at()`` moves, and gives
+each shard its lastmod so crawlers can skip the ones they already have.
+"""
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+
+from .conditional import conditional, make_etag, posts_changed_at
+from .models import Post
+
+# Well under the protocol's 50,000 URLs, so a rebuild stays cheap.
+SHARD_SIZE = 5000
+SITEMAP_CACHE_CONTROL = {"public": True, "max_age": 3600}
+# Entries are keyed on their version; this only clears out old ones.
+CACHE_TIMEOUT = 60 * 60 * 24
+CONTENT_TYPE = "application/xml; charset=utf-8"
+
+
+class Section:
+    """Public pages derived from published posts, sharded on ``key``."""
+
+    key = "id"
+
+    def rows(self):
+        return Post.objects.all()
+
+    def posts_in(self, shard):
+        lo = shard * SHARD_SIZE
+        return self.rows().filter(**{f"{self.key}__gte": lo, f"{self.key}__lt": lo + SHARD_SIZE})
+
+    def shards(self):
+        """``[(shard, lastmod)]`` for every shard with a published post."""
+        rows = (self.rows().annotate(shard=F(self.key) / SHARD_SIZE)
+                .values("shard")
+                .annotate(lastmod=Max("updated_at"), published=Count("id", filter=Q(published=True)))
+                .order_by("shard"))
+        return [(row["shard"], row["lastmod"]) for row in rows if row["published"]]
+
+    def version(self, shard):
+        """``(lastmod, published posts)``; drafts count toward lastmod, so
+        unpublishing one changes it too."""
+        row = self.posts_in(shard).aggregate(
+            lastmod=Max("updated_at"), published=Count("id", filter=Q(published=True)),
+        )
+        return row["lastmod"], row["published"]
+
+    def entries(self, shard):
+        """Yield ``(path, lastmod)`` for the shard's pages in key order."""
+        raise NotImplementedError
+
+
+class PostSection(Section):
+    def entries(self, shard):
+        rows = (self.posts_in(shard).filter(published=True)
+                .order_by("id").values_list("slug", "updated_at").iterator(chunk_size=1000))
+        for slug, updated_at in rows:
+            yield reverse("blog:post-detail", args=[slug]), updated_at
+
+
+class AuthorSection(Section):
+    key = "author_id"
+
+    def entries(self, shard):
+        rows = (self.posts_in(shard).filter(published=True)
+                .values("author_id", "author__username")
+                .annotate(lastmod=Max("updated_at"))
+                .order_by("author_id"))
+        for row in rows.iterator(chunk_size=1000):
+            yield reverse("user:public-profile", args=[row["author__username"]]), row["lastmod"]
+
+
+class TagSection(Section):
+    """Tag pages, sharded on the ids of the posts that carry them.
+
+    Rows are (post, tag) pairs, so tagging or untagging a published post
+    changes its shard's count. A tag used across shards is listed in each,
+    which the protocol allows.
+    """
+
+    def rows(self):
+        return Post.objects.filter(tags__isnull=False)
+
+    def entries(self, shard):
+        rows = (self.posts_in(shard).filter(published=True)
+                .values("tags__slug")
+                .annotate(lastmod=Max("updated_at"))
+                .order_by("tags__slug"))
+        for row in rows.iterator(chunk_size=1000):
+            yield reverse("blog:tag-posts", args=[row["tags__slug"]]), row["lastmod"]
+
+
+SECTIONS = {
+    "posts": PostSection(),
+    "authors": AuthorSection(),
+    "tags": TagSection(),
+}
+
+
+def _url(loc, lastmod, tag="url"):
+    return f"<{tag}><loc>{escape(loc)}</loc><lastmod>{lastmod.isoformat()}</lastmod></{tag}>\n"
+
+
+def _render(request, root, items, tag="url"):
+    """The document as bytes, built from an iterator of ``(path, lastmod)``."""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+             f'<{root} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+    parts.extend(_url(request.build_absolute_uri(path), lastmod, tag) for path, lastmod in items)
+    parts.append(f"</{root}>\n")
+    return "".join(parts).encode()
+
+
+def _cached(key, build):
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, CACHE_TIMEOUT)
+    return HttpResponse(body, content_type=CONTENT_TYPE)
+
+
+def _index_validators(request):
+    changed_at = posts_changed_at()
+    # Stash the key for the view, which only runs when the body is needed.
+    request.sitemap_etag = make_etag("sitemap-index", request.get_host(), changed_at)
+    return (request.sitemap_etag,), changed_at
+
+
+@conditional(_index_validators, SITEMAP_CACHE_CONTROL)
+def sitemap_index(request):
+    def build():
+        shards = ((reverse("sitemap-shard", args=[name, shard]), lastmod)
+                  for name, section in SECTIONS.items() for shard, lastmod in section.shards())
+        return _render(request, "sitemapindex", shards, tag="sitemap")
+    return _cached(f"sitemap:{request.sitemap_etag}", build)
+
+
+def _shard_validators(request, section, shard):
+    if section not in SECTIONS:
+        raise Http404
+    lastmod, published = SECTIONS[section].version(shard)
+    if not published:
+        raise Http404
+    request.sitemap_etag = make_etag("sitemap", request.get_host(), section, shard, lastmod, published)
+    return (request.sitemap_etag,), lastmod
+
+
+@conditional(_shard_validators, SITEMAP_CACHE_CONTROL)
+def sitemap_shard(request, section, shard):
+    def build():
+        return _render(request, "urlset", SECTIONS[section].entries(shard))
+    return _cached(f"sitemap:{request.sitemap_etag}", build)
@@ -0,0 +1,221 @@
+(function () {
+  /* ── Live markdown preview ────────────────────────────── */
+  // Rendered by the server with the same Markdown extensions as the
+  // published post, a moment after the author stops typing.
+  const editor  = document.getElementById('md-editor');
+  const preview = document.getElementById('md-preview');
+  const csrf    = editor.form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+  const EMPTY   = '<p class="preview-empty">Start typing to see a preview\u2026</p>';
+  let pending = null, timer = null;
+  function renderMd() {
+    if (pending) pending.abort();
+    if (!editor.value.trim()) { preview.innerHTML = EMPTY; return; }
+    pending = new AbortController();
+    fetch(preview.dataset.url, {
+      method: 'POST',
+      headers: { 'X-CSRFToken': csrf },
+      body: new URLSearchParams({ content: editor.value }),
+      signal: pending.signal,
+    })
+      .then(r => r.ok ? r.text() : Promise.reject(r))
+      .then(html => { preview.innerHTML = html; })
+      .catch(() => {});
+  }
+  editor.addEventListener('input', () => {
+    clearTimeout(timer);
+    timer = setTimeout(renderMd, 300);
+  });
+  renderMd();
+
+  /* ── Publish toggle label ─────────────────────────────── */
+  const publishCb   = document.querySelector('.publish-toggle input[type="checkbox"]');
+  const toggleText  = document.getElementById('toggle-text');
+  function syncToggleText() {
+    toggleText.textContent = publishCb.checked ? 'Publish immediately' : 'Save as draft';
+  }
+  publishCb.addEventListener('change', syncToggleText);
+  syncToggleText();
+
+  /* ── Tag picker ───────────────────────────────────────── */
+  // The form renders one hidden input per tag of the post. Names typed
+  // here are completed from the tag search API; a name that matches no
+  // tag is kept as typed and created when the post is saved.
+  const tagSelectEl = document.getElementById('tag-select');
+  if (!tagSelectEl) return;
+
+  const nativeWrap = document.getElementById('tags-native');
+  const slugOf     = name => name.trim().toLowerCase().replace(/[^\w\s-]/g, '').replace(/[\s_-]+/g, '-');
+
+  // ── Build DOM ──────────────────────────────────────────
+  const trigger = document.createElement('div');
+  trigger.className = 'tag-select-trigger';
+
+  const input = document.createElement('input');
+  input.type = 'text';
+  input.className = 'tag-select-input';
+  input.placeholder = 'Add tags…';
+  input.autocomplete = 'off';
+  input.setAttribute('aria-label', 'Add a tag');
+
+  const dropdown = document.createElement('div');
+  dropdown.className = 'tag-select-dropdown';
+
+  const dropHeader = document.createElement('div');
+  dropHeader.className = 'tag-select-header';
+  dropHeader.textContent = 'Matching tags';
+  dropdown.appendChild(dropHeader);
+
+  const list = document.createElement('div');
+  list.className = 'tag-select-list';
+  dropdown.appendChild(list);
+
+  tagSelectEl.appendChild(trigger);
+  tagSelectEl.appendChild(dropdown);
+
+  // ── Selected tags: hidden inputs + pills ───────────────
+  function selectedInputs() {
+    return Array.from(nativeWrap.querySelectorAll('input[type="hidden"]'));
+  }
+  function isSelected(name) {
+    return selectedInputs().some(el => slugOf(el.value) === slugOf(name));
+  }
+
+  function addTag(name) {
+    name = name.trim().replace(/\s+/g, ' ');
+    if (!slugOf(name) || isSelected(name)) return;
+    const hidden = document.createElement('input');
+    hidden.type = 'hidden';
+    hidden.name = 'tags';
+    hidden.value = name;
+    nativeWrap.appendChild(hidden);
+    renderPills();
+  }
+
+  function removeTag(hidden) {
+    hidden.remove();
+    renderPills();
+  }
+
+  function renderPills() {
+    trigger.querySelectorAll('.tag-select-pill').forEach(el => el.remove());
+    selectedInputs().forEach(hidden => {
+      const pill = document.createElement('span');
+      pill.className = 'tag-select-pill';
+      pill.textContent = hidden.value;
+
+      const remove = document.createElement('button');
+      remove.type = 'button';
+      remove.className = 'tag-select-remove';
+      remove.textContent = '×';
+      remove.setAttribute('aria-label', `Remove ${hidden.value}`);
+      remove.addEventListener('click', (e) => {
+        e.stopPropagation();
+        removeTag(hidden);
+      });
+
+      pill.appendChild(remove);
+      trigger.insertBefore(pill, input);
+    });
+  }
+  trigger.appendChild(input);
+  renderPills();
+
+  // ── Suggestions ────────────────────────────────────────
+  let suggestions = [], active = -1, searching = null, searchTimer = null;
+
+  function renderSuggestions() {
+    list.innerHTML = '';
+    const typed = input.value.trim();
+    const items = suggestions.filter(tag => !isSelected(tag.name));
+    if (typed && !suggestions.some(tag => tag.slug === slugOf(typed)) && !isSelected(typed)) {
+      items.push({ name: typed, create: true });
+    }
+    if (items.length === 0) {
+      const empty = document.createElement('div');
+      empty.className = 'tag-select-empty';
+      empty.textContent = typed ? 'Already added' : 'Type to search tags';
+      list.appendChild(empty);
+    }
+    active = Math.min(active, items.length - 1);
+    items.forEach((tag, i) => {
+      const item = document.createElement('div');
+      item.className = 'tag-select-item' + (i === active ? ' active' : '');
+
+      const nameEl = document.createElement('span');
+      nameEl.className = 'tag-select-item-name';
+      nameEl.textContent = tag.create ? `Create “${tag.name}”` : tag.name;
+      item.appendChild(nameEl);
+
+      if (!tag.create) {
+        const count = document.createElement('span');
+        count.className = 'tag-select-count';
+        count.textContent = tag.post_count;
+        item.appendChild(count);
+      }
+
+      // mousedown, so the input keeps focus and the dropdown stays open
+      item.addEventListener('mousedown', (e) => {
+        e.preventDefault();
+        choose(tag.name);
+      });
+      list.appendChild(item);
+    });
+    return items;
+  }
+
+  function search() {
+    if (searching) searching.abort();
+    const query = input.value.trim();
+    if (!slugOf(query)) { suggestions = []; renderSuggestions(); return; }
+    searching = new AbortController();
+    fetch(`${tagSelectEl.dataset.url}?${new URLSearchParams({ q: query })}`, { signal: searching.signal })
+      .then(r => r.ok ? r.json() : Promise.reject(r))
+      .then(data => {
+        suggestions = data.tags;
+        active = suggestions.length ? 0 : -1;
+        renderSuggestions();
+      })
+      .catch(() => {});
+  }
+
+  function choose(name) {
+    addTag(name);
+    input.value = '';
+    suggestions = [];
+    active = -1;
+    renderSuggestions();
+  }
+
+  // ── Toggle dropdown open/close ─────────────────────────
+  function openDropdown()  { dropdown.classList.add('open'); trigger.classList.add('open'); renderSuggestions(); }
+  function closeDropdown() { dropdown.classList.remove('open'); trigger.classList.remove('open'); }
+
+  trigger.addEventListener('click', () => input.focus());
+  input.addEventListener('focus', openDropdown);
+  input.addEventListener('blur', closeDropdown);
+  input.addEventListener('input', () => {
+    active = -1;   // Enter before the results arrive takes the text as typed
+    openDropdown();
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(search, 150);
+  });
+  input.addEventListener('keydown', (e) => {
+    const items = list.querySelectorAll('.tag-select-item');
+    if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+      e.preventDefault();
+      if (!items.length) return;
+      active = (active + (e.key === 'ArrowDown' ? 1 : items.length - 1)) % items.length;
+      renderSuggestions();
+    } else if (e.key === 'Enter' || e.key === ',') {
+      e.preventDefault();   // never submit the post from the tag box
+      const shown = renderSuggestions();
+      if (active >= 0 && shown[active]) choose(shown[active].name);
+      else if (input.value.trim()) choose(input.value);
+    } else if (e.key === 'Backspace' && !input.value) {
+      const last = selectedInputs().pop();
+      if (last) removeTag(last);
+    } else if (e.key === 'Escape') {
+      closeDropdown();
+    }
+  });
+}());
@@ -0,0 +1,52 @@
+"""The tag cloud and tag autocompletion.
+
+The cloud lists every tag in use and its number of published posts. The
+counts are the ``Tag.post_count`` counters kept by ``blog.signals``, so
+the cloud is a single query over the tag table with no join or GROUP BY.
+The result is cached under the ``tags`` fragment stamp, which is bumped
+whenever a post's tags or published flag change, and is otherwise read
+straight from the cache.
+
+Autocompletion matches a prefix against ``Tag.slug``, which is unique and
+so indexed, and reads at most ``COMPLETE_LIMIT`` rows off that index
+however many tags there are.
+"""
+from django.core.cache import cache
+from django.db import connections
+from django.utils.text import slugify
+
+from . import fragments
+from .models import Tag
+
+COMPLETE_LIMIT = 10
+
+
+def tag_cloud():
+    """``[{"name", "slug", "post_count"}]`` for tags with published posts, by name."""
+    key = f"tag-cloud:{fragments.version(fragments.TAGS)}"
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(Tag.objects.filter(post_count__gt=0).order_by("name").values("name", "slug", "post_count"))
+        cache.set(key, tags, None)
+    return tags
+
+
+def complete_tags(prefix, limit=COMPLETE_LIMIT):
+    """The first ``limit`` tags whose slug starts with ``prefix``'s, by slug.
+
+    Slug order puts an exact match first and shorter tags before the
+    longer ones that extend them.
+    """
+    slug = slugify(prefix)
+    if not slug:
+        return []
+    tags = Tag.objects.all()
+    if connections[tags.db].vendor == "sqlite":
+        # SQLite's LIKE is case-insensitive and escaped, so it cannot use
+        # the index. Slugs are plain ASCII below DEL, so a range can.
+        tags = tags.filter(slug__gte=slug, slug__lt=f"{slug}\x7f")
+    else:
+        # PostgreSQL serves LIKE 'prefix%' from the varchar_pattern_ops
+        # index Django adds next to the unique one, then sorts the matches.
+        tags = tags.filter(slug__startswith=slug)
+    return list(tags.order_by("slug").values("name", "slug", "post_count")[:limit])
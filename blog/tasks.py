@@ -0,0 +1,35 @@
+"""Post-processing run by the task worker instead of the request.
+
+Enqueued with the ``TASKS`` backend from settings: immediate (inline) by
+default, or the database queue drained by ``manage.py run_worker``.
+"""
+from django.tasks import task
+from django.utils import timezone
+
+from . import fragments
+from .models import Post
+from .rendering import summarize
+
+
+@task()
+def render_post(post_id):
+    """Render a post saved with ``render=False`` and refresh its summary."""
+    fields = ("author_id", "content", "content_html", "content_html_key", "excerpt", "summary")
+    post = Post.objects.filter(pk=post_id).only(*fields).first()
+    if post is None:
+        return False
+    rendered = post.refresh_content_html()
+    summary = post.excerpt.strip() or summarize(post.content_html)
+    if not rendered and summary == post.summary:
+        return True
+    # update() skips the post_save receivers, so the cached fragments
+    # showing the summary are bumped here. updated_at moves with what
+    # readers see, for posts_changed_at() and the export stream.
+    Post.objects.filter(pk=post_id).update(
+        content_html=post.content_html,
+        content_html_key=post.content_html_key,
+        summary=summary,
+        updated_at=timezone.now(),
+    )
+    fragments.bump(fragments.FEED, fragments.post_key(post_id), fragments.author_key(post.author_id))
+    return True
@@ -1,13 +1,44 @@
+import asyncio
+import gzip
+import json
+import re
+from datetime import date, timedelta
+from io import StringIO
+
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
-from django.test import Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, Q
+from django.http import Http404
+from django.tasks import TaskResultStatus, task
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import AsyncClient, AsyncRequestFactory, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from blog_project import routers
+from jobs.models import Job
+from user.models import AuthorStats, DailyActivity
 
-from .models import Post, Tag
+from . import fragments, pagecache, sitemaps, views
+from .export import CHUNK_SIZE as EXPORT_CHUNK_SIZE
+from .importing import allocate_slugs, import_posts, read_markdown_dir
+from .models import Comment, Post, Tag
+from .rendering import render_key
+from .tasks import render_post
 
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
 @pytest.fixture
 def user():
     return User.objects.create_user(username="testuser", password="pass1234")
@@ -70,6 +101,11 @@ def test_post_create_saves_and_redirects(auth_client, user):
     assert Post.objects.filter(title="Brand New Post", author=user).exists()
 
 
+def test_post_create_deduplicates_slug(auth_client, post):
+    auth_client.post(reverse("blog:post-create"), {"title": post.title, "content": "Again"})
+    assert Post.objects.filter(title=post.title).order_by("id").last().slug == f"{post.slug}-1"
+
+
 def test_post_edit_by_non_owner_returns_404(other_user, post):
     c = Client()
     c.login(username="otheruser", password="pass1234")
@@ -90,3 +126,1013 @@ def test_blog_home_shows_only_own_posts(auth_client, user, other_user):
     response = auth_client.get(reverse("blog:blog-home"))
     assert b"My Post" in response.content
     assert b"Other User Post" not in response.content
+
+
+def test_post_html_rendered_on_save(post):
+    assert "<strong>markdown</strong>" in post.content_html
+    post.content = "Now *edited*"
+    post.save()
+    post.refresh_from_db()
+    assert "<em>edited</em>" in post.content_html
+
+
+def test_stored_html_served_without_rendering(post, monkeypatch):
+    def fail(text):
+        raise AssertionError("markdown rendered on the read path")
+    monkeypatch.setattr("blog.models.render_markdown", fail)
+    post = Post.objects.get(pk=post.pk)
+    assert "<strong>markdown</strong>" in post.get_content_html()
+
+
+def test_stale_html_rerendered_lazily(post, monkeypatch):
+    monkeypatch.setattr("blog.rendering.RENDERER_VERSION", 999)
+    Post.objects.get(pk=post.pk).get_content_html()
+    post.refresh_from_db()
+    assert post.content_html_key == render_key(post.content)
+
+
+def test_render_posts_command_backfills(post):
+    Post.objects.filter(pk=post.pk).update(content_html="", content_html_key="")
+    call_command("render_posts", "--batch-size", "1", stdout=StringIO())
+    post.refresh_from_db()
+    assert "<strong>markdown</strong>" in post.content_html
+
+
+def test_api_post_list_keyset_pagination(user, settings):
+    settings.POSTS_PAGE_SIZE = 2
+    for i in range(5):
+        Post.objects.create(title=f"Post {i}", content="x", author=user, published=True)
+    c = Client()
+    first = c.get(reverse("blog:api-post-list")).json()
+    assert [p["title"] for p in first["posts"]] == ["Post 4", "Post 3"]
+    assert first["previous"] is None and "count" not in first
+
+    second = c.get(reverse("blog:api-post-list"), {"cursor": first["next"]}).json()
+    assert [p["title"] for p in second["posts"]] == ["Post 2", "Post 1"]
+
+    back = c.get(reverse("blog:api-post-list"), {"cursor": second["previous"]}).json()
+    assert [p["title"] for p in back["posts"]] == ["Post 4", "Post 3"]
+    assert back["previous"] is None
+
+    last = c.get(reverse("blog:api-post-list"), {"cursor": second["next"], "count": "1"}).json()
+    assert [p["title"] for p in last["posts"]] == ["Post 0"]
+    assert last["next"] is None and last["count"] == 5
+
+
+def test_api_post_list_rejects_bad_cursor():
+    response = Client().get(reverse("blog:api-post-list"), {"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+def test_blog_home_paginates(auth_client, user, settings):
+    settings.POSTS_PAGE_SIZE = 1
+    Post.objects.create(title="Older Post", content="x", author=user)
+    Post.objects.create(title="Newer Post", content="x", author=user)
+    response = auth_client.get(reverse("blog:blog-home"))
+    assert b"Newer Post" in response.content
+    assert b"Older Post" not in response.content
+    assert b"Load more" in response.content
+
+
+def _export(client, cursor=None):
+    params = {"cursor": cursor} if cursor else {}
+    response = client.get(reverse("blog:api-post-export"), params)
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert lines[-1]["type"] == "cursor"
+    return lines[:-1], lines[-1]["cursor"]
+
+
+def test_api_post_export_syncs_incrementally(user, post, monkeypatch):
+    monkeypatch.setattr("blog.export.SETTLE_TIME", timedelta(0))
+    draft = Post.objects.create(title="Draft", content="x", author=user)
+    c = Client()
+
+    lines, cursor = _export(c)
+    assert [(line["type"], line["id"]) for line in lines] == [("post", post.id)]
+    assert lines[0]["content_html"]
+
+    lines, cursor = _export(c, cursor)
+    assert lines == []
+
+    post.published = False
+    post.save()
+    other = Post.objects.create(title="Second", content="y", author=user, published=True)
+    lines, cursor = _export(c, cursor)
+    assert [(line["type"], line["id"]) for line in lines] == [("tombstone", post.id), ("post", other.id)]
+
+    other_id = other.id
+    other.delete()
+    draft.delete()
+    lines, cursor = _export(c, cursor)
+    assert lines == [{"type": "tombstone", "id": other_id, "reason": "deleted"}]
+
+
+def test_api_post_export_rejects_bad_cursor():
+    response = Client().get(reverse("blog:api-post-export"), {"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+def test_api_post_detail_not_modified(post):
+    url = reverse("blog:api-post-detail", kwargs={"slug": post.slug})
+    c = Client()
+    first = c.get(url)
+    assert first.status_code == 200
+    assert "max-age=60" in first["Cache-Control"]
+    assert c.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    post.title = "Retitled"
+    post.save()
+    assert c.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+
+def test_api_post_list_etag_changes_on_delete(post):
+    url = reverse("blog:api-post-list")
+    c = Client()
+    etag = c.get(url)["ETag"]
+    assert c.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    post.delete()
+    assert c.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_post_detail_etag_changes_on_comment(auth_client, user, post):
+    url = reverse("blog:post-detail", kwargs={"slug": post.slug})
+    first = auth_client.get(url)
+    assert "private" in first["Cache-Control"]
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    auth_client.post(url, {"body": "Nice post"})
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+
+def test_search_ranks_title_matches_first(user):
+    body = Post.objects.create(title="Notes", content="All about django migrations", author=user, published=True)
+    title = Post.objects.create(title="Django migrations explained", content="x", author=user, published=True)
+    Post.objects.create(title="Django draft", content="django", author=user, published=False)
+    Post.objects.create(title="Unrelated", content="cooking", author=user, published=True)
+
+    data = Client().get(reverse("blog:api-post-search"), {"q": "django migrations"}).json()
+    assert [p["id"] for p in data["posts"]] == [title.id, body.id]
+
+
+def test_search_index_follows_edits(user, post):
+    post.content = "Now about kubernetes"
+    post.save()
+    response = Client().get(reverse("blog:post-search"), {"q": "kubernetes"})
+    assert b"Hello World" in response.content
+    assert not Client().get(reverse("blog:api-post-search"), {"q": "markdown"}).json()["posts"]
+
+
+def test_admin_post_search_uses_index(post):
+    User.objects.create_superuser(username="admin", password="pass1234")
+    c = Client()
+    c.login(username="admin", password="pass1234")
+    response = c.get("/admin/blog/post/", {"q": "markdown"})
+    assert list(response.context["cl"].result_list) == [post]
+
+
+def test_daily_activity_tracks_writes(user, other_user, post):
+    row = DailyActivity.objects.get(user=user)
+    assert (row.posts, row.published_posts) == (1, 1)
+
+    post.published = False
+    post.save()
+    Comment.objects.create(post=post, author=user, body="hi")
+    Comment.objects.create(post=post, author=other_user, body="hey")
+    row.refresh_from_db()
+    assert (row.posts, row.published_posts, row.comments) == (1, 0, 1)
+
+    post.delete()
+    row.refresh_from_db()
+    assert (row.posts, row.published_posts, row.comments) == (0, 0, 0)
+
+
+def test_profile_served_from_rollup(auth_client, user, post, django_assert_max_num_queries):
+    Post.objects.create(title="Draft", content="x", author=user)
+    auth_client.get(reverse("user:profile"))  # warm the cache
+    with django_assert_max_num_queries(2):  # session + user only
+        response = auth_client.get(reverse("user:profile"))
+    assert (response.context["total_posts"], response.context["draft_posts"]) == (2, 1)
+    today = [d for week in response.context["weeks"] for d in week if d["date"] == date.today()]
+    assert today[0]["count"] == 2
+
+
+def test_rebuild_activity_command(user, post):
+    DailyActivity.objects.all().delete()
+    call_command("rebuild_activity", stdout=StringIO())
+    assert DailyActivity.objects.get(user=user).posts == 1
+
+
+def test_counters_follow_writes(user, other_user, post):
+    django, python = Tag.objects.create(name="Django"), Tag.objects.create(name="Python")
+    post.tags.set([django, python])
+    draft = Post.objects.create(title="Draft", content="x", author=user)
+    draft.tags.add(django)
+    comment = Comment.objects.create(post=post, author=other_user, body="hi")
+    Comment.objects.create(post=post, author=other_user, body="spam", approved=False)
+
+    post.refresh_from_db()
+    django.refresh_from_db()
+    assert post.comment_count == 1
+    assert django.post_count == 1
+    stats = user.stats
+    assert (stats.published_posts, stats.draft_posts) == (1, 1)
+    assert other_user.stats.comments == 2
+
+    comment.approved = False
+    comment.save()
+    draft.published = True
+    draft.save()
+    post.tags.remove(python)
+    post.refresh_from_db()
+    django.refresh_from_db()
+    python.refresh_from_db()
+    assert (post.comment_count, django.post_count, python.post_count) == (0, 2, 0)
+
+    post.delete()
+    django.refresh_from_db()
+    stats.refresh_from_db()
+    assert django.post_count == 1
+    assert (stats.published_posts, stats.draft_posts) == (1, 0)
+
+
+def test_removing_unlinked_tags_changes_no_counts(user, post):
+    linked, unlinked = Tag.objects.create(name="Django"), Tag.objects.create(name="Python")
+    post.tags.add(linked)
+    other = Post.objects.create(title="Other", content="x", author=user, published=True)
+    for _ in range(2):
+        post.tags.remove(unlinked)
+        unlinked.posts.remove(other)
+        linked.posts.remove(other)
+    post.tags.remove(linked, unlinked)
+    post.tags.remove(linked)
+    linked.refresh_from_db()
+    unlinked.refresh_from_db()
+    assert (linked.post_count, unlinked.post_count) == (0, 0)
+
+
+def test_recount_repairs_drift(user, post):
+    tag = Tag.objects.create(name="Django")
+    post.tags.add(tag)
+    Comment.objects.create(post=post, author=user, body="hi")
+    Post.objects.update(comment_count=42)
+    Tag.objects.update(post_count=42)
+    AuthorStats.objects.all().delete()
+    call_command("recount", stdout=StringIO())
+    post.refresh_from_db()
+    tag.refresh_from_db()
+    assert (post.comment_count, tag.post_count) == (1, 1)
+    assert AuthorStats.objects.get(user=user).comments == 1
+
+
+# ── Query budgets ────────────────────────────────────────────────────────────
+# Every page must issue a constant number of queries however much data there
+# is. Each URL is measured against N=10 and N=1000 seeded posts, tags and
+# comments; raising a budget should be a deliberate, reviewed change.
+
+def _seed(n, author, other):
+    tags = Tag.objects.bulk_create(Tag(name=f"tag {i}", slug=f"tag-{i}") for i in range(n))
+    posts = []
+    for i in range(n):
+        p = Post(title=f"Seeded {i}", slug=f"seeded-{i}", content=f"Post **{i}**",
+                 author=author if i % 2 else other, published=i % 3 != 0)
+        p.refresh_content_html()
+        posts.append(p)
+    posts = Post.objects.bulk_create(posts)
+    Post.tags.through.objects.bulk_create(
+        Post.tags.through(post=p, tag=tags[(i + k) % n]) for i, p in enumerate(posts) for k in range(2)
+    )
+    Comment.objects.bulk_create(
+        Comment(post=posts[i % 5], author=other, body=f"Comment {i}") for i in range(n)
+    )
+    return posts
+
+
+BUDGETS = [
+    # (url name, kwargs, authenticated, query budget)
+    ("home", {}, False, 0),
+    ("home", {}, True, 7),
+    ("blog:blog-home", {}, True, 5),
+    ("blog:post-create", {}, True, 2),
+    ("blog:post-search", {}, False, 2),
+    ("blog:api-docs", {}, False, 0),
+    ("blog:api-post-list", {}, False, 5),
+    ("blog:api-post-search", {}, False, 2),
+    ("blog:api-post-detail", {"slug": "seeded-1"}, False, 3),
+    ("blog:post-edit", {"slug": "seeded-1"}, True, 4),
+    ("blog:post-delete", {"slug": "seeded-1"}, True, 3),
+    ("blog:post-detail", {"slug": "seeded-1"}, True, 6),
+    ("blog:post-comments", {"slug": "seeded-1"}, True, 4),
+    ("blog:feed-rss", {}, False, 3),
+    ("blog:feed-atom", {}, False, 3),
+    ("blog:tag-posts", {"slug": "tag-1"}, False, 4),
+    ("blog:tag-feed-rss", {"slug": "tag-1"}, False, 5),
+    ("blog:tag-feed-atom", {"slug": "tag-1"}, False, 5),
+    ("blog:api-tag-list", {}, False, 1),
+    ("blog:api-tag-search", {}, False, 1),
+    ("blog:api-tag-posts", {"slug": "tag-1"}, False, 7),
+    ("user:register", {}, False, 0),
+    ("user:profile", {}, True, 3),
+    ("user:public-profile", {"username": "testuser"}, False, 4),
+    ("user:feed-rss", {"username": "testuser"}, False, 5),
+    ("user:feed-atom", {"username": "testuser"}, False, 5),
+]
+
+
+@pytest.mark.parametrize("n", [10, 1000])
+@pytest.mark.parametrize("name, kwargs, authenticated, budget", BUDGETS)
+def test_query_budget(n, name, kwargs, authenticated, budget, user, other_user,
+                      auth_client, django_assert_max_num_queries):
+    _seed(n, author=user, other=other_user)
+    client = auth_client if authenticated else Client()
+    url = reverse(name, kwargs=kwargs)
+    if name.endswith("search"):
+        url += "?q=tag" if "tag" in name else "?q=seeded"
+    with django_assert_max_num_queries(budget):
+        response = client.get(url)
+    assert response.status_code in (200, 302)
+
+
+@pytest.mark.parametrize("n", [10, 1000])
+def test_export_query_budget(n, user, other_user, django_assert_max_num_queries):
+    # The export streams the whole corpus: a fixed cost plus two queries
+    # (posts, their tags) per chunk.
+    _seed(n, author=user, other=other_user)
+    chunks = -(-n // EXPORT_CHUNK_SIZE)
+    with django_assert_max_num_queries(3 + 2 * chunks):
+        response = Client().get(reverse("blog:api-post-export"))
+        b"".join(response.streaming_content)
+
+
+def test_summary_generated_from_content(user):
+    post = Post.objects.create(title="T", content="# Heading\n\nSome **bold** & text", author=user)
+    assert post.summary == "Heading Some bold & text"
+    post.excerpt = "Hand-written"
+    post.save()
+    assert post.summary == "Hand-written"
+
+
+def test_listings_do_not_fetch_post_bodies(auth_client, post):
+    with CaptureQueriesContext(connection) as ctx:
+        response = auth_client.get(reverse("home"))
+    assert b"Some markdown content" in response.content
+    assert not any('"blog_post"."content"' in q["sql"] for q in ctx.captured_queries)
+
+
+def test_feed_and_cards_served_from_fragment_cache(auth_client, user, post, django_assert_max_num_queries):
+    other = Post.objects.create(title="Second", content="x", author=user, published=True)
+    auth_client.get(reverse("home"))
+    with django_assert_max_num_queries(5):  # feed validators, session, user
+        response = auth_client.get(reverse("home"))
+    assert b"Hello World" in response.content
+
+    card = fragments.version(fragments.post_key(other.pk))
+    post.title = "Renamed"
+    post.save()
+    assert fragments.version(fragments.post_key(other.pk)) == card
+    assert b"Renamed" in auth_client.get(reverse("home")).content
+
+
+def test_comment_invalidates_only_the_comment_thread(auth_client, user, post):
+    url = reverse("blog:post-detail", kwargs={"slug": post.slug})
+    tags = fragments.version(fragments.post_key(post.pk, "tags"))
+    auth_client.get(url)
+    Comment.objects.create(post=post, author=user, body="Pending", approved=False)
+    assert b"Pending" not in auth_client.get(url).content
+    Comment.objects.create(post=post, author=user, body="First!")
+    assert b"First!" in auth_client.get(url).content
+    assert fragments.version(fragments.post_key(post.pk, "tags")) == tags
+
+
+def test_tag_rename_invalidates_tag_lists(auth_client, post):
+    tag = Tag.objects.create(name="django")
+    post.tags.add(tag)
+    url = reverse("blog:post-detail", kwargs={"slug": post.slug})
+    assert b"django" in auth_client.get(url).content
+    tag.name = "flask"
+    tag.save()
+    assert b"flask" in auth_client.get(url).content
+
+
+def test_anonymous_page_cache_hits_and_purges(user, post, settings, django_assert_num_queries):
+    settings.PAGE_CACHE_TIMEOUT = 300
+    client = Client()
+    url = reverse("blog:api-post-detail", kwargs={"slug": post.slug})
+    assert client.get(url)["X-Cache"] == "MISS"
+    with django_assert_num_queries(0):
+        hit = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+    assert (hit["X-Cache"], hit["Content-Encoding"]) == ("HIT", "gzip")
+    assert json.loads(gzip.decompress(hit.content))["title"] == "Hello World"
+    assert client.get(url, HTTP_IF_NONE_MATCH=hit["ETag"]).status_code == 304
+
+    Comment.objects.create(post=post, author=user, body="hi")
+    miss = client.get(url)
+    assert (miss["X-Cache"], miss.json()["comment_count"]) == ("MISS", 1)
+
+
+def test_anonymous_page_cache_purges_only_affected_authors(user, other_user, post, auth_client, settings):
+    settings.PAGE_CACHE_TIMEOUT = 300
+    client = Client()
+    mine = reverse("user:public-profile", kwargs={"username": user.username})
+    theirs = reverse("user:public-profile", kwargs={"username": other_user.username})
+    client.get(mine), client.get(theirs)
+    Post.objects.create(title="New", content="x", author=other_user, published=True)
+    assert client.get(mine)["X-Cache"] == "HIT"
+    assert client.get(theirs)["X-Cache"] == "MISS"
+    assert auth_client.get(mine)["X-Cache"] == "BYPASS"
+
+
+def test_anonymous_page_cache_skips_pages_written_during_render(user, post, settings, monkeypatch):
+    settings.PAGE_CACHE_TIMEOUT = 300
+    url = reverse("blog:api-post-detail", kwargs={"slug": post.slug})
+    tag = pagecache.tag
+
+    def tag_after_a_write(response, *keys):
+        # The view read the post, then a comment landed before it returned.
+        Comment.objects.create(post=post, author=user, body="hi")
+        return tag(response, *keys)
+
+    monkeypatch.setattr(pagecache, "tag", tag_after_a_write)
+    assert Client().get(url).json()["comment_count"] == 0
+    monkeypatch.setattr(pagecache, "tag", tag)
+    fresh = Client().get(url)
+    assert (fresh["X-Cache"], fresh.json()["comment_count"]) == ("MISS", 1)
+    assert Client().get(url)["X-Cache"] == "HIT"
+
+
+def test_anonymous_page_cache_hits_keep_security_headers(user, post, settings):
+    settings.PAGE_CACHE_TIMEOUT = 300
+    client = Client()
+    for url in ("/", reverse("user:public-profile", args=[user.username]), reverse("blog:api-post-list")):
+        miss, hit = client.get(url), client.get(url)
+        assert (miss["X-Cache"], hit["X-Cache"]) == ("MISS", "HIT")
+        for header in ("X-Frame-Options", "X-Content-Type-Options", "Referrer-Policy",
+                       "Cross-Origin-Opener-Policy", "Content-Type", "Cache-Control"):
+            assert hit.get(header) == miss.get(header), (url, header)
+        assert hit["X-Frame-Options"] == "DENY"
+
+
+def test_async_middleware_keeps_cache_calls_off_the_event_loop(post, settings, monkeypatch):
+    settings.PAGE_CACHE_TIMEOUT, settings.METRICS_ENABLED = 300, True
+    for name in ("get", "set", "get_many", "set_many"):
+        method = getattr(LocMemCache, name)
+
+        def guarded(self, *args, _method=method, **kwargs):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return _method(self, *args, **kwargs)
+        monkeypatch.setattr(LocMemCache, name, guarded)
+
+    async def fetch():
+        client = AsyncClient()
+        url = reverse("blog:api-post-detail", kwargs={"slug": post.slug})
+        return [(await client.get(url))["X-Cache"] for _ in range(2)]
+
+    assert async_to_sync(fetch)() == ["MISS", "HIT"]
+
+
+@pytest.mark.parametrize("name, kwargs", [
+    ("api_post_list", {}),
+    ("api_post_detail", {"slug": "hello-world"}),
+])
+def test_async_api_views_match_sync(name, kwargs, user, post):
+    Comment.objects.create(post=post, author=user, body="hi")
+    expected = getattr(views, name)(RequestFactory().get("/?count=1"), **kwargs)
+    response = async_to_sync(getattr(views, f"{name}_async"))(AsyncRequestFactory().get("/?count=1"), **kwargs)
+    assert response.status_code == 200
+    assert json.loads(response.content) == json.loads(expected.content)
+    assert response["ETag"] == expected["ETag"]
+
+    revalidated = async_to_sync(getattr(views, f"{name}_async"))(
+        AsyncRequestFactory().get("/?count=1", headers={"If-None-Match": response["ETag"]}), **kwargs,
+    )
+    assert revalidated.status_code == 304
+
+
+def test_async_export_streams_in_chunks(user, post, monkeypatch):
+    monkeypatch.setattr("blog.export.SETTLE_TIME", timedelta(0))
+    monkeypatch.setattr("blog.export.CHUNK_SIZE", 1)
+    Post.objects.create(title="Second", content="y", author=user, published=True)
+    expected = b"".join(Client().get(reverse("blog:api-post-export")).streaming_content)
+
+    async def export():
+        response = await views.api_post_export_async(AsyncRequestFactory().get("/"))
+        assert response.is_async
+        return [line async for line in response.streaming_content]
+
+    lines = async_to_sync(export)()
+    assert len(lines) == 3 and b"".join(lines) == expected
+
+
+def test_async_api_detail_404():
+    with pytest.raises(Http404):
+        async_to_sync(views.api_post_detail_async)(AsyncRequestFactory().get("/"), slug="missing")
+
+
+def test_server_timing_and_metrics(auth_client, post, settings):
+    settings.METRICS_ENABLED = True
+    timing = auth_client.get(reverse("blog:post-detail", kwargs={"slug": post.slug}))["Server-Timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="Database, \d+ queries"', timing)
+    assert "template;dur=" in timing and "total;dur=" in timing
+    created = auth_client.post(reverse("blog:post-create"), {"title": "Timed", "content": "*hi*"})
+    assert "markdown;dur=" in created["Server-Timing"]
+
+    text = Client().get(reverse("metrics")).content.decode()
+    assert 'inkwell_request_duration_seconds_count{view="blog:post-detail",method="GET"} 1' in text
+    assert 'inkwell_markdown_renders_total{view="blog:post-create",method="POST"} 1' in text
+    assert Client(REMOTE_ADDR="203.0.113.9").get(reverse("metrics")).status_code == 404
+
+
+def test_metrics_disabled_by_default():
+    response = Client().get(reverse("home"))
+    assert "Server-Timing" not in response
+    assert Client().get(reverse("metrics")).status_code == 404
+
+
+def test_seed_inkwell_command():
+    call_command("seed_inkwell", users=3, posts=40, comments=120, stdout=StringIO())
+    assert User.objects.filter(username__startswith="seed").count() == 3
+    assert Client().login(username="seed0", password="inkwell-bench")
+    post = Post.objects.annotate(n=Count("comments", filter=Q(comments__approved=True))).first()
+    assert post.comment_count == post.n
+    assert post.content_html_key == render_key(post.content) and post.summary
+    assert len({p.created_at.date() for p in Post.objects.all()}) > 1
+    tag = Tag.objects.annotate(n=Count("posts", filter=Q(posts__published=True))).order_by("-n").first()
+    assert tag.post_count == tag.n
+    assert AuthorStats.objects.filter(user__username="seed0").exists()
+
+
+def test_seeded_posts_reach_export_and_list_validators(user, post, monkeypatch):
+    monkeypatch.setattr("blog.export.SETTLE_TIME", timedelta(0))
+    client = Client()
+    _, cursor = _export(client)
+    etag = client.get(reverse("blog:api-post-list"))["ETag"]
+    call_command("seed_inkwell", users=1, posts=5, comments=0, stdout=StringIO())
+    lines, _ = _export(client, cursor)
+    seeded = Post.objects.filter(author__username="seed0", published=True)
+    assert {line["id"] for line in lines if line["type"] == "post"} == set(seeded.values_list("id", flat=True))
+    assert client.get(reverse("blog:api-post-list"), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_allocate_slugs_in_one_query(user):
+    for slug in ("hello-world", "hello-world-1", "hello-world-3", "hello-worldly"):
+        Post.objects.create(title=slug, slug=slug, content="x", author=user)
+    with CaptureQueriesContext(connection) as ctx:
+        slugs = allocate_slugs(["Hello World", "Hello, world!", "Hello World", "Fresh", "Fresh", "!!!"])
+    assert len(ctx.captured_queries) == 1
+    assert slugs == ["hello-world-2", "hello-world-4", "hello-world-5", "fresh", "fresh-1", "post"]
+
+
+def test_route_names_are_not_used_as_post_slugs(auth_client, user):
+    for title in ("Search", "Preview"):
+        auth_client.post(reverse("blog:post-create"), {"title": title, "content": "x", "published": "on"})
+    assert Post.objects.create(title="New", content="x", author=user, published=True).slug == "new-1"
+    assert sorted(Post.objects.values_list("slug", flat=True)) == ["new-1", "preview-1", "search-1"]
+    assert allocate_slugs(["API", "Tags", "Feed"]) == ["api-1", "tags-1", "feed-1"]
+    for post in Post.objects.all():
+        response = auth_client.get(reverse("blog:post-detail", args=[post.slug]))
+        assert response.status_code == 200 and post.title in response.content.decode()
+
+
+def test_import_posts_jsonl(user, tmp_path):
+    Tag.objects.create(name="python")
+    source = tmp_path / "posts.jsonl"
+    source.write_text("\n".join(json.dumps(r) for r in [
+        {"title": "First", "content": "# One", "tags": ["Python", "new tag"], "published": True,
+         "date": "2020-05-01"},
+        {"title": "First", "content": "Two", "tags": "new tag", "author": "testuser"},
+    ]) + "\n\n")
+    out = StringIO()
+    call_command("import_posts", str(source), author="testuser", published=True, batch_size=1, stdout=out)
+    assert "Imported 2 posts" in out.getvalue()
+    first, second = Post.objects.order_by("id")
+    assert (first.slug, second.slug) == ("first", "first-1")
+    assert first.created_at.date() == date(2020, 5, 1) and first.content_html_key == render_key(first.content)
+    assert sorted(first.tags.values_list("name", flat=True)) == ["new tag", "python"]
+    assert Tag.objects.get(name="new tag").post_count == 2
+    assert Tag.objects.get(name="python").post_count == 1
+    assert AuthorStats.objects.get(user=user).published_posts == 2
+
+
+def test_import_posts_markdown_dir(user, tmp_path):
+    (tmp_path / "a.md").write_text(
+        "---\ntitle: Front matter title\nslug: custom\ntags:\n  - one\n  - two\npublished: yes\n---\nBody\n"
+    )
+    (tmp_path / "b-post.md").write_text("# Heading title\n\nMore **text**")
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "notes" / "plain_note.md").write_text("Just text")
+    n, _ = import_posts(read_markdown_dir(tmp_path), author=user)
+    assert n == 3
+    posts = {p.title: p for p in Post.objects.all()}
+    assert posts["Front matter title"].slug == "custom" and posts["Front matter title"].published
+    assert posts["Heading title"].content == "More **text**" and not posts["Heading title"].published
+    assert "plain note" in posts
+    assert Tag.objects.get(name="two").post_count == 1
+
+
+def test_imported_posts_reach_export_and_list_validators(user, post, monkeypatch):
+    monkeypatch.setattr("blog.export.SETTLE_TIME", timedelta(0))
+    client = Client()
+    _, cursor = _export(client)
+    etag = client.get(reverse("blog:api-post-list"))["ETag"]
+    import_posts([{"title": "From the archive", "content": "x", "date": "2015-01-01"}], author=user, published=True)
+    imported = Post.objects.get(title="From the archive")
+    assert imported.created_at.year == 2015
+    lines, _ = _export(client, cursor)
+    assert [(line["type"], line["id"]) for line in lines] == [("post", imported.id)]
+    assert client.get(reverse("blog:api-post-list"), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@task()
+def double(n):
+    return n * 2
+
+
+@task()
+def always_fails():
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def task_queue(settings):
+    settings.TASKS = {"default": {"BACKEND": "jobs.backends.DatabaseBackend",
+                                  "OPTIONS": {"MAX_ATTEMPTS": 2, "RETRY_DELAY": 0}}}
+
+
+def test_database_tasks_run_by_priority(task_queue):
+    low = double.enqueue(1)
+    high = double.using(priority=10).enqueue(2)
+    later = double.using(run_after=timezone.now() + timedelta(hours=1)).enqueue(3)
+    assert low.status == TaskResultStatus.READY
+    out = StringIO()
+    call_command("run_worker", burst=True, stdout=out)
+    assert out.getvalue().index(high.id) < out.getvalue().index(low.id)
+    assert double.get_result(high.id).return_value == 4
+    assert double.get_result(later.id).status == TaskResultStatus.READY
+
+
+def test_database_task_retries_then_fails(task_queue):
+    result = always_fails.enqueue()
+    call_command("run_worker", burst=True, stdout=StringIO())
+    result.refresh()
+    assert result.status == TaskResultStatus.FAILED and result.attempts == 2
+    assert [e.exception_class for e in result.errors] == [RuntimeError, RuntimeError]
+
+
+def test_post_edit_defers_render_to_worker(auth_client, post, task_queue):
+    auth_client.post(reverse("blog:post-edit", kwargs={"slug": post.slug}),
+                     {"title": post.title, "content": "Now *queued*"})
+    post.refresh_from_db()
+    assert post.content_html_key == "" and Job.objects.filter(status=TaskResultStatus.READY).count() == 1
+    # Readers render on demand until the worker gets to it.
+    assert "<em>queued</em>" in auth_client.get(reverse("blog:post-detail", kwargs={"slug": post.slug})).text
+    call_command("run_worker", burst=True, stdout=StringIO())
+    post.refresh_from_db()
+    assert post.content_html_key == render_key(post.content) and post.summary == "Now queued"
+
+
+def test_deferred_render_moves_api_list_validators(user, task_queue):
+    client = Client()
+    post = Post(title="Queued", content="First *words*", author=user, published=True)
+    post.save(render=False)
+    render_post.enqueue(post.pk)
+    stale = client.get(reverse("blog:api-post-list"))
+    assert stale.json()["posts"][0]["summary"] == ""
+    call_command("run_worker", burst=True, stdout=StringIO())
+    fresh = client.get(reverse("blog:api-post-list"), HTTP_IF_NONE_MATCH=stale["ETag"])
+    assert fresh.status_code == 200 and fresh.json()["posts"][0]["summary"] == "First words"
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    routers._down_until.clear()
+
+
+def _api_titles(client):
+    return [p["title"] for p in client.get(reverse("blog:api-post-list")).json()["posts"]]
+
+
+@pytest.mark.django_db(databases=["default", "replica"])
+def test_reads_use_replica_until_client_writes(replica, post):
+    c = Client()
+    assert _api_titles(c) == []  # the replica has not seen the post
+    response = c.post(reverse("login"), {"username": "testuser", "password": "pass1234"})
+    assert response.cookies[routers.PIN_COOKIE]["max-age"] == 5
+    assert _api_titles(c) == [post.title]
+    assert _api_titles(Client()) == []
+
+
+@pytest.mark.django_db(databases=["default", "replica"])
+def test_unreachable_replica_falls_back_to_primary(replica, post, monkeypatch):
+    def refuse():
+        raise OperationalError("connection refused")
+    monkeypatch.setattr(connections["replica"], "ensure_connection", refuse)
+    assert _api_titles(Client()) == [post.title]
+    monkeypatch.undo()
+    assert _api_titles(Client()) == [post.title]  # still skipped until the retry window passes
+
+
+def _comment_changelist_queries(admin_client):
+    with CaptureQueriesContext(connection) as ctx:
+        assert admin_client.get(reverse("admin:blog_comment_changelist")).status_code == 200
+    return len(ctx.captured_queries)
+
+
+def test_comment_changelist_queries_do_not_grow_with_rows(admin_client, post, user):
+    Comment.objects.create(post=post, author=user, body="first")
+    few = _comment_changelist_queries(admin_client)
+    for i in range(10):
+        other = Post.objects.create(title=f"Other {i}", content="x", author=user)
+        Comment.objects.create(post=other, author=User.objects.create(username=f"c{i}"), body="more")
+    assert _comment_changelist_queries(admin_client) == few
+
+
+def test_bulk_unapprove_comments_updates_counts(admin_client, post, user):
+    comments = [Comment.objects.create(post=post, author=user, body=str(i)) for i in range(3)]
+    version = fragments.version(fragments.post_key(post.pk, "comments"))
+    with CaptureQueriesContext(connection) as ctx:
+        admin_client.post(reverse("admin:blog_comment_changelist"), {
+            "action": "unapprove_comments", "_selected_action": [c.pk for c in comments[:2]],
+        })
+    updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "blog_comment"')]
+    assert len(updates) == 1
+    post.refresh_from_db()
+    assert post.comment_count == 1
+    assert fragments.version(fragments.post_key(post.pk, "comments")) != version
+
+
+def test_approving_a_comment_changes_api_list_etag(admin_client, post, user):
+    comment = Comment.objects.create(post=post, author=user, body="pending", approved=False)
+    client = Client()
+    url = reverse("blog:api-post-list")
+    first = client.get(url)
+    assert first.json()["posts"][0]["comment_count"] == 0
+    admin_client.post(reverse("admin:blog_comment_changelist"), {
+        "action": "approve_comments", "_selected_action": [comment.pk],
+    })
+    fresh = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert fresh.status_code == 200 and fresh["ETag"] != first["ETag"]
+    assert fresh.json()["posts"][0]["comment_count"] == 1
+
+
+def test_pages_with_forms_revalidate_after_login_rotates_csrf_token(user, post):
+    client = Client()
+    credentials = {"username": "testuser", "password": "pass1234"}
+    client.post(reverse("login"), credentials)
+    urls = ("/", reverse("blog:post-detail", args=[post.slug]))
+    etags = {url: client.get(url)["ETag"] for url in urls}
+    assert all(client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code == 304 for url in urls)
+    client.post(reverse("logout"))
+    client.post(reverse("login"), credentials)
+    for url in urls:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code == 200, url
+
+
+def test_check_query_plans_passes_on_seeded_db():
+    call_command("seed_inkwell", users=2, posts=40, comments=80, stdout=StringIO())
+    out = StringIO()
+    call_command("check_query_plans", min_rows=20, stdout=out)
+    assert "All queries on 17 pages use an index." in out.getvalue()
+
+
+def test_post_preview_renders_like_published_post(auth_client):
+    url = reverse("blog:post-preview")
+    response = auth_client.post(url, {"content": "Some **markdown**\n\n| a |\n|---|\n| 1 |"})
+    assert response.status_code == 200
+    assert b"<strong>markdown</strong>" in response.content
+    assert b"<table>" in response.content
+    assert auth_client.get(url).status_code == 405
+
+
+def test_pages_link_styles_instead_of_inlining(auth_client, post):
+    for url in ("/", reverse("blog:post-detail", args=[post.slug]), reverse("blog:post-create")):
+        html = auth_client.get(url).content.decode()
+        assert "<style" not in html
+        assert '<link rel="stylesheet" href="/static/css/base.css"' in html
+        assert "cdn.jsdelivr.net" not in html
+
+
+def test_collectstatic_writes_hashed_precompressed_files(settings, tmp_path):
+    settings.STATIC_ROOT = tmp_path
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {
+        "BACKEND": "blog_project.storage.CompressedManifestStaticFilesStorage",
+    }}
+    call_command("collectstatic", "--noinput", verbosity=0)
+    manifest = json.loads((tmp_path / "staticfiles.json").read_text())["paths"]
+    hashed = tmp_path / manifest["css/base.css"]
+    assert re.fullmatch(r"base\.[0-9a-f]{12}\.css", hashed.name)
+    assert gzip.decompress((tmp_path / f"{manifest['css/base.css']}.gz").read_bytes()) == hashed.read_bytes()
+
+
+def test_feeds_list_recent_posts(user, other_user, post):
+    Post.objects.create(title="Draft", content="x", author=user)
+    Post.objects.create(title="Elsewhere", content="x", author=other_user, published=True)
+    tag = Tag.objects.create(name="Django")
+    post.tags.add(tag)
+    client = Client()
+    site = client.get(reverse("blog:feed-rss"))
+    assert site["Content-Type"].startswith("application/rss+xml")
+    assert b"Hello World" in site.content and b"Elsewhere" in site.content and b"Draft" not in site.content
+    author = client.get(reverse("user:feed-atom", args=[user.username])).content
+    assert b"Hello World" in author and b"Elsewhere" not in author
+    tagged = client.get(reverse("blog:tag-feed-rss", args=[tag.slug])).content
+    assert b"Hello World" in tagged and b"<category>Django</category>" in tagged
+    assert client.get(reverse("blog:tag-feed-rss", args=["missing"])).status_code == 404
+
+
+def test_feed_revalidates_and_renders_once_per_change(post, monkeypatch):
+    client, url = Client(), reverse("blog:feed-atom")
+    first = client.get(url)
+    assert first.status_code == 200 and first["Last-Modified"]
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    assert len(ctx.captured_queries) == 1
+
+    def render(*args, **kwargs):
+        raise AssertionError("feed rendered again")
+    monkeypatch.setattr("django.contrib.syndication.views.Feed.__call__", render)
+    assert client.get(url).content == first.content
+
+    monkeypatch.undo()
+    post.title = "Renamed"
+    post.save()
+    changed = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert changed.status_code == 200 and b"Renamed" in changed.content
+
+
+def test_feeds_revalidate_after_tag_and_author_renames(user, post):
+    tag = Tag.objects.create(name="Django")
+    post.tags.add(tag)
+    client = Client()
+    for url in (reverse("blog:feed-rss"), reverse("user:feed-rss", args=[user.username]),
+                reverse("blog:tag-feed-rss", args=[tag.slug])):
+        etag = client.get(url)["ETag"]
+        tag.name = f"{tag.name}!"
+        tag.save()
+        renamed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert renamed.status_code == 200 and f"<category>{tag.name}</category>".encode() in renamed.content
+
+    url = reverse("blog:feed-atom")
+    etag = client.get(url)["ETag"]
+    assert Client().login(username=user.username, password="pass1234")
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    user.username = "renamed"
+    user.save()
+    renamed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert renamed.status_code == 200 and b"<name>renamed</name>" in renamed.content
+
+
+def test_sitemap_shards_list_published_pages(user, other_user, monkeypatch):
+    monkeypatch.setattr(sitemaps, "SHARD_SIZE", 2)
+    posts = [Post.objects.create(title=f"Post {i}", content="x", author=user, published=i != 1)
+             for i in range(4)]
+    client = Client()
+    index = client.get(reverse("sitemap")).content.decode()
+    shards = re.findall(r"<loc>http://testserver(/sitemap-[^<]+)</loc>", index)
+    assert shards == [
+        reverse("sitemap-shard", args=["posts", n]) for n in sorted({p.pk // 2 for p in posts if p.published})
+    ] + [reverse("sitemap-shard", args=["authors", user.pk // 2])]
+    urls = "".join(client.get(shard).content.decode() for shard in shards)
+    for i, post in enumerate(posts):
+        assert (reverse("blog:post-detail", args=[post.slug]) in urls) == (i != 1)
+    assert reverse("user:public-profile", args=[user.username]) in urls
+    assert other_user.username not in urls
+    assert client.get(reverse("sitemap-shard", args=["posts", 99])).status_code == 404
+
+
+def test_sitemap_rebuilds_only_changed_shards(user, monkeypatch):
+    monkeypatch.setattr(sitemaps, "SHARD_SIZE", 2)
+    first, *_, last = [Post.objects.create(title=f"Post {i}", content="x", author=user, published=True)
+                       for i in range(4)]
+    client = Client()
+    old, untouched = (reverse("sitemap-shard", args=["posts", p.pk // 2]) for p in (first, last))
+    assert old != untouched
+    etag = client.get(old)["ETag"]
+    bodies = {url: client.get(url).content for url in (old, untouched)}
+    assert client.get(old, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    built = []
+    entries = sitemaps.PostSection.entries
+    monkeypatch.setattr(sitemaps.PostSection, "entries",
+                        lambda self, shard: built.append(shard) or entries(self, shard))
+    first.title = "Edited"
+    first.save()
+    assert client.get(untouched).content == bodies[untouched]
+    assert client.get(old, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert built == [first.pk // 2]
+
+
+def test_post_detail_pages_comments(auth_client, user, post, settings):
+    settings.COMMENTS_PAGE_SIZE = 2
+    for i in range(5):
+        Comment.objects.create(post=post, author=user, body=f"comment {i}")
+    Comment.objects.create(post=post, author=user, body="pending", approved=False)
+    html = auth_client.get(reverse("blog:post-detail", args=[post.slug])).content.decode()
+    assert re.findall(r"comment \d", html) == ["comment 3", "comment 4"]
+    assert "pending" not in html and "5</span>" in html
+
+    shown = []
+    while match := re.search(r'data-url="([^"]+)"', html):
+        html = auth_client.get(match.group(1).replace("&amp;", "&")).content.decode()
+        shown = re.findall(r"comment \d", html) + shown
+    assert shown == ["comment 0", "comment 1", "comment 2"]
+
+
+def test_adding_a_comment_does_not_load_the_thread(auth_client, user, post):
+    Comment.objects.create(post=post, author=user, body="first")
+    url = reverse("blog:post-detail", args=[post.slug])
+    with CaptureQueriesContext(connection) as ctx:
+        response = auth_client.post(url, {"body": "second"})
+    assert response.status_code == 302
+    selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+    assert not any('FROM "blog_comment"' in sql or '"blog_post"."content"' in sql for sql in selects)
+    assert post.comments.filter(body="second").exists()
+
+
+def test_tag_page_and_api_list_published_tagged_posts(user, post):
+    tag, other = Tag.objects.create(name="Django"), Tag.objects.create(name="Flask")
+    post.tags.add(tag)
+    Post.objects.create(title="Draft", content="x", author=user).tags.add(tag)
+    Post.objects.create(title="Untagged", content="x", author=user, published=True).tags.add(other)
+    client = Client()
+    html = client.get(reverse("blog:tag-posts", args=[tag.slug])).content.decode()
+    assert "Hello World" in html and "Draft" not in html and "Untagged" not in html
+    assert reverse("blog:tag-posts", args=[other.slug]) in html  # the cloud
+    assert reverse("blog:tag-feed-atom", args=[tag.slug]) in html
+    api = client.get(reverse("blog:api-tag-posts", args=[tag.slug])).json()
+    assert [p["title"] for p in api["posts"]] == ["Hello World"]
+    assert client.get(reverse("blog:api-tag-posts", args=["missing"])).status_code == 404
+    assert client.get(reverse("blog:tag-posts", args=["missing"])).status_code == 404
+    sitemap = client.get(reverse("sitemap-shard", args=["tags", 0])).content.decode()
+    assert reverse("blog:tag-posts", args=[tag.slug]) in sitemap
+
+
+def test_api_tag_posts_revalidates_on_tag_changes(post):
+    tag = Tag.objects.create(name="Django")
+    client = Client()
+    url = reverse("blog:api-tag-posts", args=[tag.slug])
+    empty = client.get(url)
+    assert empty.json()["posts"] == []
+    assert client.get(url, HTTP_IF_NONE_MATCH=empty["ETag"]).status_code == 304
+    post.tags.add(tag)
+    tagged = client.get(url, HTTP_IF_NONE_MATCH=empty["ETag"])
+    assert tagged.status_code == 200 and [p["title"] for p in tagged.json()["posts"]] == ["Hello World"]
+    tag.name = "Flask"
+    tag.save()
+    renamed = client.get(url, HTTP_IF_NONE_MATCH=tagged["ETag"])
+    assert renamed.status_code == 200 and renamed.json()["posts"][0]["tags"] == ["Flask"]
+
+
+def test_tag_cloud_is_cached_until_tags_change(user, post):
+    tag = Tag.objects.create(name="Django")
+    post.tags.add(tag)
+    client = Client()
+    url = reverse("blog:api-tag-list")
+    first = client.get(url)
+    assert first.json()["tags"] == [{"name": "Django", "slug": "django", "post_count": 1}]
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+        assert client.get(url).json() == first.json()
+    assert not ctx.captured_queries
+
+    draft = Post.objects.create(title="Draft", content="x", author=user)
+    draft.tags.add(tag)
+    assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+    draft.published = True
+    draft.save()
+    assert client.get(url).json()["tags"][0]["post_count"] == 2
+    post.tags.clear()
+    assert client.get(url).json()["tags"][0]["post_count"] == 1
+
+
+def test_tag_search_completes_prefix_from_index(user):
+    for name in ["Python", "Python Tips", "PyTest", "Django", *(f"py-{i:02}" for i in range(12))]:
+        Tag.objects.create(name=name)
+    client = Client()
+    url = reverse("blog:api-tag-search")
+    assert [t["name"] for t in client.get(url, {"q": "python"}).json()["tags"]] == ["Python", "Python Tips"]
+    assert [t["slug"] for t in client.get(url, {"q": "Python t"}).json()["tags"]] == ["python-tips"]
+    assert len(client.get(url, {"q": "py"}).json()["tags"]) == 10
+    assert client.get(url, {"q": " !"}).json()["tags"] == []
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(url, {"q": "py"})
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {ctx.captured_queries[0]['sql']}")
+        assert "USING INDEX" in " ".join(row[3] for row in cursor.fetchall())
+
+
+def test_post_form_renders_own_tags_and_creates_new_ones(auth_client, post):
+    django, _ = Tag.objects.create(name="Django"), Tag.objects.create(name="Unrelated")
+    post.tags.add(django)
+    url = reverse("blog:post-edit", args=[post.slug])
+    html = auth_client.get(url).content.decode()
+    assert 'name="tags" value="Django"' in html and "Unrelated" not in html
+
+    with CaptureQueriesContext(connection) as ctx:
+        auth_client.post(url, {"title": post.title, "content": "x", "published": "on",
+                               "tags": ["django", "Brand  new", "brand new"]})
+    assert sorted(post.tags.values_list("name", flat=True)) == ["Brand new", "Django"]
+    assert sum(q["sql"].startswith("INSERT") and 'INTO "blog_tag" ' in q["sql"] for q in ctx.captured_queries) == 1
+    assert Tag.objects.get(name="Brand new").post_count == 1
+    assert auth_client.post(url, {"title": post.title, "content": "x", "tags": ["!!"]}).status_code == 200
@@ -1,19 +1,40 @@
+from django.conf import settings
 from django.urls import path
 
+from .feeds import posts_atom, posts_rss, tag_atom, tag_rss
 from .views import (
-    api_docs, api_post_detail, api_post_list,
-    home, post_create, post_delete, post_detail, post_edit,
+    api_docs, api_post_detail, api_post_detail_async, api_post_export, api_post_export_async,
+    api_post_list, api_post_list_async, api_post_search, api_tag_list, api_tag_posts, api_tag_search, home,
+    post_comments, post_create, post_delete, post_detail, post_edit, post_preview, post_search,
+    tag_posts,
 )
 
+# Under ASGI the read-only API is served by native async views.
+ASYNC_API = settings.SERVER_MODE == "asgi"
+
 app_name = "blog"
 
 urlpatterns = [
     path("", home, name="blog-home"),
     path("new/", post_create, name="post-create"),
+    path("search/", post_search, name="post-search"),
+    path("preview/", post_preview, name="post-preview"),
+    path("feed/rss/", posts_rss, name="feed-rss"),
+    path("feed/atom/", posts_atom, name="feed-atom"),
+    path("tags/<slug:slug>/", tag_posts, name="tag-posts"),
+    path("tags/<slug:slug>/feed/rss/", tag_rss, name="tag-feed-rss"),
+    path("tags/<slug:slug>/feed/atom/", tag_atom, name="tag-feed-atom"),
     # API — must come before <slug:slug>/ to avoid collision
     path("api/", api_docs, name="api-docs"),
-    path("api/posts/", api_post_list, name="api-post-list"),
-    path("api/posts/<slug:slug>/", api_post_detail, name="api-post-detail"),
+    path("api/posts/", api_post_list_async if ASYNC_API else api_post_list, name="api-post-list"),
+    path("api/posts/export/", api_post_export_async if ASYNC_API else api_post_export, name="api-post-export"),
+    path("api/posts/search/", api_post_search, name="api-post-search"),
+    path("api/tags/", api_tag_list, name="api-tag-list"),
+    path("api/tags/search/", api_tag_search, name="api-tag-search"),
+    path("api/tags/<slug:slug>/", api_tag_posts, name="api-tag-posts"),
+    path("api/posts/<slug:slug>/", api_post_detail_async if ASYNC_API else api_post_detail,
+         name="api-post-detail"),
+    path("<slug:slug>/comments/", post_comments, name="post-comments"),
     path("<slug:slug>/edit/", post_edit, name="post-edit"),
     path("<slug:slug>/delete/", post_delete, name="post-delete"),
     path("<slug:slug>/", post_detail, name="post-detail"),
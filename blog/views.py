@@ -1,10 +1,26 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils.text import slugify
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
 
+from user.activity import stats_for
+
+from . import fragments, pagecache
+from .conditional import conditional, posts_changed_at
+from .export import aexport_lines, export_lines, parse_export_cursor
 from .forms import CommentForm, PostForm
-from .models import Post
+from .importing import allocate_slugs
+from .models import Comment, Post, Tag
+from .pagination import InvalidCursor, apaginate, estimate_count, page_size, paginate, paginate_request
+from .rendering import render_markdown
+from .search import search_posts
+from .tagcloud import complete_tags, tag_cloud
+from .tasks import render_post
 
 
 # ── API helpers ──────────────────────────────────────────────────────────────
@@ -15,8 +31,10 @@ def _post_to_dict(post, include_content=False):
         "title": post.title,
         "slug": post.slug,
         "excerpt": post.excerpt,
+        "summary": post.summary,
         "author": post.author.username,
         "tags": [t.name for t in post.tags.all()],
+        "comment_count": post.comment_count,
         "created_at": post.created_at.isoformat(),
         "updated_at": post.updated_at.isoformat(),
     }
@@ -26,46 +44,261 @@ def _post_to_dict(post, include_content=False):
     return data
 
 
-def _api_response(data):
-    r = JsonResponse(data)
+def _api_response(data, status=200):
+    r = JsonResponse(data, status=status)
     r["Access-Control-Allow-Origin"] = "*"
     return r
 
 
+API_CACHE_CONTROL = {"public": True, "max_age": 60}
+PRIVATE_CACHE_CONTROL = {"private": True, "no_cache": True}
+
+
+def _csrf_secret(request):
+    # Pages with a form embed a token derived from this secret. Logging in
+    # rotates it, and a page revalidated across that would post a dead token.
+    # get_token() creates the secret if the client has none yet; the token it
+    # returns is masked afresh on every call, so the secret is used instead.
+    get_token(request)
+    return request.META["CSRF_COOKIE"]
+
+
+def _api_list_validators(request, *args, **kwargs):
+    changed_at = posts_changed_at()
+    # Comment approvals and tag changes move the feed stamp, not the
+    # timestamp; both show up in the listed posts.
+    feed = fragments.version(fragments.FEED)
+    return ("api-posts", changed_at, feed, request.get_full_path()), changed_at
+
+
+def _api_post_validators(request, slug):
+    row = Post.objects.filter(slug=slug, published=True).values_list("id", "updated_at").first()
+    if row is None:
+        return None, None
+    return ("api-post", *row), row[1]
+
+
+def _post_detail_validators(request, slug):
+    approved = Q(comments__approved=True)
+    # Slugs are unique, so there is one group; first() would add a sort.
+    rows = (Post.objects.filter(slug=slug)
+            .values("id", "updated_at")
+            .annotate(comments_n=Count("comments", filter=approved),
+                      comments_at=Max("comments__created_at", filter=approved))
+            .order_by()[:1])
+    if not rows:
+        return None, None
+    row = rows[0]
+    changed_at = max(filter(None, (row["updated_at"], row["comments_at"])))
+    return ("post", *row.values(), request.user.pk, _csrf_secret(request)), changed_at
+
+
+def _home_validators(request):
+    if not request.user.is_authenticated:
+        # The anonymous landing page does not depend on any data.
+        return ("landing",), None
+    changed_at = posts_changed_at()
+    feed = fragments.version(fragments.FEED)
+    parts = ("home", request.user.pk, _csrf_secret(request), changed_at, feed, request.get_full_path())
+    return parts, changed_at
+
+
+def _home_cache_control(request):
+    if request.user.is_authenticated:
+        return PRIVATE_CACHE_CONTROL
+    return {"public": True, "max_age": 300}
+
+
 def api_docs(request):
     base_url = request.build_absolute_uri("/").rstrip("/")
-    return render(request, "blog/api_docs.html", {"base_url": base_url})
+    return pagecache.tag(render(request, "blog/api_docs.html", {"base_url": base_url}), "api-docs")
 
 
-def api_post_list(request):
+def _api_list_queryset(request):
     qs = (Post.objects
+          .for_listing()
           .filter(published=True)
           .select_related("author")
-          .prefetch_related("tags")
-          .order_by("-created_at"))
+          .prefetch_related("tags"))
     author = request.GET.get("author")
     if author:
         qs = qs.filter(author__username=author)
-    return _api_response({"count": qs.count(), "posts": [_post_to_dict(p) for p in qs]})
+    return qs
 
 
-def api_post_detail(request, slug):
-    post = get_object_or_404(
-        Post.objects.select_related("author").prefetch_related("tags"),
-        slug=slug, published=True,
+def _api_list_response(page, count=None):
+    data = {
+        "posts": [_post_to_dict(p) for p in page],
+        "next": page.next_cursor,
+        "previous": page.prev_cursor,
+    }
+    if count is not None:
+        data["count"] = count
+    return pagecache.tag(_api_response(data), fragments.FEED)
+
+
+@conditional(_api_list_validators, API_CACHE_CONTROL)
+def api_post_list(request):
+    qs = _api_list_queryset(request)
+    try:
+        page = paginate(qs, request.GET.get("cursor"), page_size(request.GET.get("limit")))
+    except InvalidCursor:
+        return _api_response({"error": "Invalid cursor."}, status=400)
+    count = estimate_count(qs) if request.GET.get("count") else None
+    return _api_list_response(page, count)
+
+
+@conditional(_api_list_validators, API_CACHE_CONTROL)
+async def api_post_list_async(request):
+    qs = _api_list_queryset(request)
+    try:
+        page = await apaginate(qs, request.GET.get("cursor"), page_size(request.GET.get("limit")))
+    except InvalidCursor:
+        return _api_response({"error": "Invalid cursor."}, status=400)
+    count = await sync_to_async(estimate_count)(qs) if request.GET.get("count") else None
+    return _api_list_response(page, count)
+
+
+def _search(request):
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return query, []
+    qs = Post.objects.for_listing().filter(published=True).select_related("author").prefetch_related("tags")
+    return query, list(search_posts(qs, query)[:page_size(request.GET.get("limit"))])
+
+
+def api_post_search(request):
+    query, posts = _search(request)
+    return pagecache.tag(_api_response({
+        "query": query,
+        "posts": [{**_post_to_dict(p), "rank": p.rank} for p in posts],
+    }), fragments.FEED)
+
+
+def _export_response(request, lines):
+    cursor = request.GET.get("cursor")
+    try:
+        post_pos, deletion_pos = parse_export_cursor(cursor) if cursor else (None, None)
+    except InvalidCursor:
+        return _api_response({"error": "Invalid cursor."}, status=400)
+    response = StreamingHttpResponse(
+        lines(post_pos, deletion_pos, initial=not cursor, serialize=_post_to_dict),
+        content_type="application/x-ndjson",
     )
-    return _api_response(_post_to_dict(post, include_content=True))
+    response["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+def api_post_export(request):
+    return _export_response(request, export_lines)
+
+
+async def api_post_export_async(request):
+    return _export_response(request, aexport_lines)
+
+
+def _api_detail_queryset():
+    return Post.objects.filter(published=True).select_related("author").prefetch_related("tags")
 
 
+@conditional(_api_post_validators, API_CACHE_CONTROL)
+def api_post_detail(request, slug):
+    post = get_object_or_404(_api_detail_queryset(), slug=slug)
+    return pagecache.tag(_api_response(_post_to_dict(post, include_content=True)), fragments.post_key(post.pk))
+
+
+@conditional(_api_post_validators, API_CACHE_CONTROL)
+async def api_post_detail_async(request, slug):
+    try:
+        post = await _api_detail_queryset().aget(slug=slug)
+    except Post.DoesNotExist:
+        raise Http404("No Post matches the given query.")
+    await post.aget_content_html()
+    return pagecache.tag(_api_response(_post_to_dict(post, include_content=True)), fragments.post_key(post.pk))
+
+
+def _tag_list_validators(request):
+    # The cloud is cached under its stamp, so revalidating needs no query.
+    return ("api-tags", fragments.version(fragments.TAGS)), None
+
+
+@conditional(_tag_list_validators, API_CACHE_CONTROL)
+def api_tag_list(request):
+    return pagecache.tag(_api_response({"tags": tag_cloud()}), fragments.TAGS)
+
+
+def api_tag_search(request):
+    """Tags whose names start with ``q``, for the editor's tag picker."""
+    query = request.GET.get("q", "").strip()
+    return _api_response({"query": query, "tags": complete_tags(query)})
+
+
+def _tag_posts(tag):
+    # EXISTS rather than a join, so the newest published posts are read in
+    # order off the feed index and probed against the tag. A join makes
+    # SQLite sort every post of a popular tag to show its first page.
+    tagged = Post.tags.through.objects.filter(tag=tag, post=OuterRef("pk"))
+    return (Post.objects
+            .for_listing()
+            .filter(Exists(tagged), published=True)
+            .select_related("author")
+            .prefetch_related("tags"))
+
+
+def _api_tag_posts_validators(request, slug):
+    tag_id = Tag.objects.filter(slug=slug).values_list("id", flat=True).first()
+    if tag_id is None:
+        raise Http404
+    # Tagging, untagging and renaming move the tag's stamp, not the posts'.
+    parts, changed_at = _api_list_validators(request)
+    stamps = fragments.versions(fragments.tag_key(tag_id), fragments.TAGS)
+    return (*parts, sorted(stamps.items())), changed_at
+
+
+@conditional(_api_tag_posts_validators, API_CACHE_CONTROL)
+def api_tag_posts(request, slug):
+    tag = get_object_or_404(Tag, slug=slug)
+    try:
+        page = paginate(_tag_posts(tag), request.GET.get("cursor"), page_size(request.GET.get("limit")))
+    except InvalidCursor:
+        return _api_response({"error": "Invalid cursor."}, status=400)
+    return _api_list_response(page)
+
+
+@conditional(_home_validators, _home_cache_control)
 def public_home(request):
-    posts = Post.objects.filter(published=True).select_related("author").prefetch_related("tags").order_by("-created_at")
-    return render(request, "home.html", {"posts": posts})
+    if not request.user.is_authenticated:
+        # Anonymous visitors only see the landing hero.
+        return pagecache.tag(render(request, "home.html"), "landing")
+    posts = Post.objects.for_listing().filter(published=True).select_related("author").prefetch_related("tags")
+    return render(request, "home.html", {
+        "feed_version": fragments.version(fragments.FEED),
+        # Only queried when the cached feed fragment is missing or stale.
+        "posts": SimpleLazyObject(lambda: fragments.attach_versions(paginate_request(request, posts))),
+    })
+
+
+def tag_posts(request, slug):
+    tag = get_object_or_404(Tag, slug=slug)
+    page = paginate_request(request, _tag_posts(tag))
+    response = render(request, "blog/tag_posts.html", {"tag": tag, "posts": page, "tags": tag_cloud()})
+    return pagecache.tag(response, fragments.tag_key(tag.pk), fragments.TAGS,
+                         *(fragments.post_key(p.pk) for p in page))
+
+
+def post_search(request):
+    query, posts = _search(request)
+    return render(request, "blog/post_search.html", {"query": query, "posts": posts})
 
 
 @login_required
 def home(request):
-    posts = Post.objects.filter(author=request.user).select_related("author").prefetch_related("tags").order_by("-created_at")
-    return render(request, "blog/home.html", {"posts": posts})
+    posts = Post.objects.for_listing().filter(author=request.user).select_related("author").prefetch_related("tags")
+    stats = stats_for(request.user)
+    return render(request, "blog/home.html", {
+        "posts": paginate_request(request, posts),
+        "total_posts": stats.published_posts + stats.draft_posts,
+    })
 
 
 @login_required
@@ -75,22 +308,25 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            # Deduplicate slug — Post.save() auto-generates from title but
-            # the unique constraint will raise IntegrityError on duplicates.
-            base_slug = slugify(post.title)
-            slug, n = base_slug, 1
-            while Post.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{n}"
-                n += 1
-            post.slug = slug
-            post.save()
+            # Post.save() would slugify the title as-is and trip the unique
+            # constraint on a duplicate; take the next free suffix instead.
+            post.slug = allocate_slugs([post.title])[0]
+            post.save(render=False)
             form.save_m2m()  # must come after post.save()
+            render_post.enqueue(post.pk)
             return redirect("blog:blog-home")
     else:
         form = PostForm()
     return render(request, "blog/post_create.html", {"form": form})
 
 
+@login_required
+@require_POST
+def post_preview(request):
+    """The editor's live preview, rendered exactly as the published post will be."""
+    return HttpResponse(render_markdown(request.POST.get("content", "")))
+
+
 @login_required
 def post_delete(request, slug):
     post = get_object_or_404(Post, slug=slug, author=request.user)
@@ -105,7 +341,10 @@ def post_edit(request, slug):
     if request.method == "POST":
         form = PostForm(request.POST, instance=post)
         if form.is_valid():
-            form.save()
+            post = form.save(commit=False)
+            post.save(render=False)
+            form.save_m2m()
+            render_post.enqueue(post.pk)
             return redirect("blog:post-detail", slug=post.slug)
     else:
         form = PostForm(instance=post)
@@ -113,20 +352,47 @@ def post_edit(request, slug):
 
 
 @login_required
+@conditional(_post_detail_validators, PRIVATE_CACHE_CONTROL)
 def post_detail(request, slug):
-    post = get_object_or_404(
-        Post.objects.select_related("author").prefetch_related("tags", "comments__author"),
-        slug=slug,
-    )
     if request.method == "POST":
+        # Adding a comment needs the post's id, not the post or its thread.
+        post_id = get_object_or_404(Post.objects.values_list("id", flat=True), slug=slug)
         form = CommentForm(request.POST)
         if form.is_valid():
-            comment = form.save(commit=False)
-            comment.post = post
-            comment.author = request.user
-            comment.save()
+            form.instance.post_id = post_id
+            form.instance.author = request.user
+            form.save()
             return redirect("blog:post-detail", slug=slug)
     else:
         form = CommentForm()
-    comments = post.comments.filter(approved=True).select_related("author")
-    return render(request, "blog/post_detail.html", {"post": post, "comments": comments, "form": form})
+    # Tags and comments are left to the template, which only queries them
+    # when their cached fragments are missing or stale.
+    post = get_object_or_404(Post.objects.select_related("author"), slug=slug)
+    stamps = fragments.versions(*(fragments.post_key(post.pk, part) for part in ("tags", "comments")))
+    return render(request, "blog/post_detail.html", {
+        "post": post,
+        "comments": SimpleLazyObject(lambda: _oldest_first(paginate(
+            _thread(post.pk), size=settings.COMMENTS_PAGE_SIZE))),
+        "form": form,
+        "tags_version": stamps[fragments.post_key(post.pk, "tags")],
+        "comments_version": stamps[fragments.post_key(post.pk, "comments")],
+    })
+
+
+def _thread(post_id):
+    return Comment.objects.filter(post_id=post_id, approved=True).select_related("author")
+
+
+def _oldest_first(page):
+    """Pages of a thread are fetched newest first, then shown oldest first;
+    ``next_cursor`` leads to older comments."""
+    page.items.reverse()
+    return page
+
+
+@login_required
+def post_comments(request, slug):
+    """The comments before ``?cursor=``, as HTML for "Load older comments"."""
+    post_id = get_object_or_404(Post.objects.values_list("id", flat=True), slug=slug)
+    page = paginate_request(request, _thread(post_id), settings.COMMENTS_PAGE_SIZE)
+    return render(request, "blog/includes/comments.html", {"comments": _oldest_first(page), "slug": slug})
@@ -0,0 +1,114 @@
+"""Read replicas with read-your-writes stickiness.
+
+For GET/HEAD requests ``ReplicaMiddleware`` picks a reachable replica from
+DATABASE_REPLICAS and ``ReplicaRouter`` sends that request's reads to it.
+Writes always go to ``default``. A request that writes sets a cookie that
+keeps the client's reads on the primary for REPLICA_PIN_SECONDS, so a new
+post or comment is visible on the next page even if the replica lags.
+
+Code outside a request (commands, the task worker) always uses the primary,
+as do reads later in a request that has written. A replica that refuses
+connections is skipped for REPLICA_RETRY_SECONDS.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "primary_pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_current = ContextVar("db_routing", default=None)
+# Replica alias -> time.monotonic() before which it is not tried again.
+_down_until = {}
+
+
+class RequestRouting:
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def healthy_replica():
+    """A replica alias that accepts connections, or None."""
+    now = time.monotonic()
+    aliases = [alias for alias in settings.DATABASE_REPLICAS if _down_until.get(alias, 0) <= now]
+    random.shuffle(aliases)
+    for alias in aliases:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            logger.warning("Replica %s is unavailable; reading from the primary", alias, exc_info=True)
+            _down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+            continue
+        return alias
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _current.get()
+        if routing and routing.replica and not routing.wrote:
+            return routing.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data, so rows read from a replica can
+        # be related to rows saved on the primary.
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _may_use_replica(request):
+        return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(healthy_replica() if self._may_use_replica(request) else None)
+        token = _current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(response, routing)
+
+    async def __acall__(self, request):
+        replica = await sync_to_async(healthy_replica)() if self._may_use_replica(request) else None
+        routing = RequestRouting(replica)
+        token = _current.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(response, routing)
+
+    @staticmethod
+    def _finish(response, routing):
+        if routing.wrote:
+            response.set_cookie(PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+        return response
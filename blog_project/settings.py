@@ -32,10 +32,14 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "blog",
     "user",
+    "jobs",
 ]
 
 MIDDLEWARE = [
+    "blog.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "blog.pagecache.AnonymousPageCacheMiddleware",
+    "blog_project.routers.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -48,7 +52,8 @@ ROOT_URLCONF = "blog_project.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, plus render timing for Server-Timing (blog.metrics)
+        "BACKEND": "blog.metrics.InstrumentedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -62,6 +67,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "blog_project.wsgi.application"
+ASGI_APPLICATION = "blog_project.asgi.application"
+
+# "wsgi" (sync gunicorn workers) or "asgi" (uvicorn workers, async API views);
+# see gunicorn.conf.py.
+SERVER_MODE = config("SERVER_MODE", default="wsgi")
 
 
 # Database
@@ -78,6 +88,19 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database: a comma-separated list of hosts, or
+# of database files with SQLite. Safe requests read from one of them; see
+# blog_project/routers.py.
+DATABASE_REPLICAS = []
+for i, location in enumerate(config("DB_REPLICAS", default="", cast=Csv()), 1):
+    replica_field = "NAME" if DATABASES["default"]["ENGINE"].endswith("sqlite3") else "HOST"
+    DATABASES[f"replica{i}"] = {**DATABASES["default"], replica_field: location}
+    DATABASE_REPLICAS.append(f"replica{i}")
+DATABASE_ROUTERS = ["blog_project.routers.ReplicaRouter"]
+# Seconds a client that has just written keeps reading from the primary.
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5, cast=int)
+REPLICA_RETRY_SECONDS = config("REPLICA_RETRY_SECONDS", default=30, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -115,6 +138,14 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+STATICFILES_DIRS = [BASE_DIR / "static"]
+
+# collectstatic writes content-hashed copies (base.3f9a1c2b7d4e.css) that
+# {% static %} links to, plus .gz/.br siblings that nginx serves as-is.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "blog_project.storage.CompressedManifestStaticFilesStorage"},
+}
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
@@ -124,3 +155,45 @@ LOGOUT_REDIRECT_URL = "home"
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 CSRF_TRUSTED_ORIGINS = config("CSRF_TRUSTED_ORIGINS", default="http://localhost", cast=Csv())
+
+# Keyset pagination for post listings and the JSON API
+POSTS_PAGE_SIZE = config("POSTS_PAGE_SIZE", default=20, cast=int)
+POSTS_MAX_PAGE_SIZE = config("POSTS_MAX_PAGE_SIZE", default=100, cast=int)
+# Newest comments shown on a post; older ones load on demand
+COMMENTS_PAGE_SIZE = config("COMMENTS_PAGE_SIZE", default=50, cast=int)
+
+# Template fragments and per-user rollups. locmem is per process, so with
+# several gunicorn workers use a shared backend (the compose files use the
+# file-based one) or invalidations only reach the worker that made them.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="inkwell"),
+        "OPTIONS": {"MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=10000, cast=int)},
+    }
+}
+
+# Background tasks (django.tasks). The immediate backend runs them inline;
+# jobs.backends.DatabaseBackend queues them for `manage.py run_worker`.
+TASKS = {
+    "default": {
+        "BACKEND": config("TASK_BACKEND", default="django.tasks.backends.immediate.ImmediateBackend"),
+        "OPTIONS": {
+            "MAX_ATTEMPTS": config("TASK_MAX_ATTEMPTS", default=3, cast=int),
+            "RETRY_DELAY": config("TASK_RETRY_DELAY", default=10, cast=int),
+        },
+    }
+}
+
+# Seconds to keep full responses for anonymous readers; 0 turns it off.
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=0, cast=int)
+
+# Server-Timing headers and the Prometheus /metrics endpoint (blog.metrics).
+# /metrics only answers clients in METRICS_ALLOWED_NETWORKS; nginx hides it.
+METRICS_ENABLED = config("METRICS_ENABLED", default=False, cast=bool)
+METRICS_FLUSH_SECONDS = config("METRICS_FLUSH_SECONDS", default=10, cast=int)
+METRICS_ALLOWED_NETWORKS = config(
+    "METRICS_ALLOWED_NETWORKS",
+    default="127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16",
+    cast=Csv(),
+)
@@ -5,5 +5,17 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
-    }
+    },
+    # A separate database, so tests can tell which one served a read. Only
+    # routed to by tests that put it in DATABASE_REPLICAS.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
+DATABASE_REPLICAS = []
+# No collectstatic in tests, so there is no manifest to look hashed names up in.
+STORAGES = {
+    **STORAGES,  # noqa: F405
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
 }
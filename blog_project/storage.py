@@ -0,0 +1,47 @@
+"""Static files storage that precompresses what collectstatic writes.
+
+``ManifestStaticFilesStorage`` gives every file a content-hashed name, so
+nginx can cache those for a year. After hashing, each text file gets a
+``.gz`` sibling and, if the optional ``brotli`` package is installed, a
+``.br`` one. nginx serves the sibling directly (``gzip_static``) instead of
+compressing the same bytes on every request.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".xml", ".html")
+# Below this the compressed file plus headers saves next to nothing.
+MIN_SIZE = 512
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Templates only ever link to the hashed names.
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE):
+                self._compress(name)
+
+    def _compress(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < MIN_SIZE:
+            return
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
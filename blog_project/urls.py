@@ -18,8 +18,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from blog.sitemaps import sitemap_index, sitemap_shard
 from blog.views import public_home
 
+from .views import metrics
+
 handler404 = "blog_project.views.page_not_found"
 
 urlpatterns = [
@@ -28,4 +31,7 @@ urlpatterns = [
     path("accounts/", include("django.contrib.auth.urls")),
     path("user/", include("user.urls")),
     path("blog/", include("blog.urls")),
+    path("metrics", metrics, name="metrics"),
+    path("sitemap.xml", sitemap_index, name="sitemap"),
+    path("sitemap-<slug:section>-<int:shard>.xml", sitemap_shard, name="sitemap-shard"),
 ]
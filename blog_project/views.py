@@ -1,5 +1,15 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from blog.metrics import is_internal, prometheus_text
+
 
 def page_not_found(request, exception):
     return render(request, "404.html", status=404)
+
+
+def metrics(request):
+    if not settings.METRICS_ENABLED or not is_internal(request):
+        raise Http404
+    return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
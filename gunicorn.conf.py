@@ -0,0 +1,18 @@
+# Gunicorn settings shared by both serving modes; see SERVER_MODE in .env.
+#
+#   wsgi (default)  sync workers, one request per worker process at a time
+#   asgi            uvicorn workers, the JSON API runs as native async views
+#                   so slow API clients no longer pin a whole process
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.environ.get("GUNICORN_WORKERS", 3))
+timeout = 120
+accesslog = "-"
+errorlog = "-"
+
+if os.environ.get("SERVER_MODE", "wsgi") == "asgi":
+    worker_class = "uvicorn_worker.UvicornWorker"
+    wsgi_app = "blog_project.asgi:application"
+else:
+    wsgi_app = "blog_project.wsgi:application"
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["task_path", "status", "queue_name", "priority", "enqueued_at", "finished_at", "attempts"]
+    list_filter = ["status", "queue_name", "task_path"]
+    readonly_fields = [f.name for f in Job._meta.fields]
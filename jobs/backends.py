@@ -0,0 +1,125 @@
+"""A ``django.tasks`` backend that keeps the queue in the database.
+
+``enqueue`` inserts a ``Job`` row, in the caller's transaction, so a task
+enqueued next to a write is only visible to workers once that write commits.
+``manage.py run_worker`` claims runnable rows highest priority first and
+records the outcome. OPTIONS:
+
+* ``MAX_ATTEMPTS`` (3): runs before a failing task is left FAILED.
+* ``RETRY_DELAY`` (10): seconds before the first retry, doubling after each.
+* ``LEASE_SECONDS`` (600): a job RUNNING for longer than this is assumed to
+  belong to a dead worker and is handed out again.
+"""
+from datetime import timedelta
+from traceback import format_exception
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.tasks import TaskContext, TaskResultStatus
+from django.tasks.backends.base import BaseTaskBackend
+from django.tasks.exceptions import TaskResultDoesNotExist
+from django.tasks.signals import task_enqueued, task_finished, task_started
+from django.utils import timezone
+from django.utils.json import normalize_json
+
+from .models import Job
+
+
+class DatabaseBackend(BaseTaskBackend):
+    supports_defer = True
+    supports_async_task = True
+    supports_get_result = True
+    supports_priority = True
+
+    def __init__(self, alias, params):
+        super().__init__(alias, params)
+        self.max_attempts = self.options.get("MAX_ATTEMPTS", 3)
+        self.retry_delay = self.options.get("RETRY_DELAY", 10)
+        self.lease = timedelta(seconds=self.options.get("LEASE_SECONDS", 600))
+
+    def enqueue(self, task, args, kwargs):
+        self.validate_task(task)
+        job = Job.objects.create(
+            backend=self.alias,
+            task_path=task.module_path,
+            queue_name=task.queue_name,
+            priority=task.priority,
+            args=normalize_json(args),
+            kwargs=normalize_json(kwargs),
+            run_after=task.run_after or timezone.now(),
+        )
+        result = job.to_result()
+        task_enqueued.send(type(self), task_result=result)
+        return result
+
+    def get_result(self, result_id):
+        try:
+            return Job.objects.get(pk=result_id, backend=self.alias).to_result()
+        except (Job.DoesNotExist, ValidationError):
+            raise TaskResultDoesNotExist(result_id) from None
+
+    # ── Worker side ──────────────────────────────────────────────────────────
+
+    def claim(self, queues, worker_id):
+        """Mark the next runnable job RUNNING and return it, or None."""
+        now = timezone.now()
+        runnable = Job.objects.filter(
+            Q(status=TaskResultStatus.READY, run_after__lte=now)
+            | Q(status=TaskResultStatus.RUNNING, last_attempted_at__lt=now - self.lease),
+            backend=self.alias,
+            queue_name__in=queues,
+        ).order_by("-priority", "run_after")
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                job = runnable.select_for_update(skip_locked=True).first()
+                return job if job and self._take(job, worker_id, now) else None
+        # Without row locks (SQLite), the status check in _take settles races:
+        # a worker that lost one updates nothing and tries the next row.
+        for job in runnable[:5]:
+            if self._take(job, worker_id, now):
+                return job
+        return None
+
+    @staticmethod
+    def _take(job, worker_id, now):
+        taken = Job.objects.filter(
+            pk=job.pk, status=job.status, last_attempted_at=job.last_attempted_at,
+        ).update(status=TaskResultStatus.RUNNING, last_attempted_at=now, started_at=job.started_at or now)
+        if taken:
+            job.status, job.last_attempted_at = TaskResultStatus.RUNNING, now
+            job.started_at = job.started_at or now
+            job.worker_ids.append(worker_id)
+            job.save(update_fields=["worker_ids"])
+        return taken
+
+    def run(self, job):
+        """Run a claimed job and record success, a retry or the failure."""
+        result = job.to_result()
+        task_started.send(type(self), task_result=result)
+        try:
+            if result.task.takes_context:
+                value = result.task.call(TaskContext(task_result=result), *job.args, **job.kwargs)
+            else:
+                value = result.task.call(*job.args, **job.kwargs)
+            job.return_value = normalize_json(value)
+        except KeyboardInterrupt:
+            raise
+        except BaseException as exc:
+            job.errors.append({
+                "exception_class_path": f"{type(exc).__module__}.{type(exc).__qualname__}",
+                "traceback": "".join(format_exception(exc)),
+            })
+            if job.attempts < self.max_attempts:
+                job.status = TaskResultStatus.READY
+                job.run_after = timezone.now() + timedelta(seconds=self.retry_delay * 2 ** (job.attempts - 1))
+            else:
+                job.status = TaskResultStatus.FAILED
+                job.finished_at = timezone.now()
+        else:
+            job.status = TaskResultStatus.SUCCESSFUL
+            job.finished_at = timezone.now()
+        job.save(update_fields=["status", "run_after", "finished_at", "errors", "return_value"])
+        if job.status != TaskResultStatus.READY:
+            task_finished.send(type(self), task_result=job.to_result())
+        return job
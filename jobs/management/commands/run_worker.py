@@ -0,0 +1,80 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.tasks import DEFAULT_TASK_BACKEND_ALIAS, DEFAULT_TASK_QUEUE_NAME, TaskResultStatus, task_backends
+from django.utils.crypto import get_random_string
+
+from jobs.backends import DatabaseBackend
+
+
+class Command(BaseCommand):
+    help = "Run tasks queued with jobs.backends.DatabaseBackend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue", action="append", dest="queues",
+                            help=f"Queue to take jobs from; repeatable (default: {DEFAULT_TASK_QUEUE_NAME}).")
+        parser.add_argument("--backend", default=DEFAULT_TASK_BACKEND_ALIAS)
+        parser.add_argument("--concurrency", type=int, default=1, help="Jobs to run at once, one thread each.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is runnable.")
+
+    def handle(self, *args, queues, backend, concurrency, poll_interval, burst, **options):
+        self.backend = task_backends[backend]
+        if not isinstance(self.backend, DatabaseBackend):
+            raise CommandError(f"Task backend {backend!r} is not a jobs.backends.DatabaseBackend.")
+        self.queues = queues or [DEFAULT_TASK_QUEUE_NAME]
+        self.poll_interval, self.burst = poll_interval, burst
+        self.stopping, self.lock, self.done = threading.Event(), threading.Lock(), 0
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            handlers = {signum: signal.signal(signum, self._stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+        self.stdout.write(f"Worker running {concurrency} thread(s) on {', '.join(self.queues)}")
+        try:
+            if concurrency == 1:
+                done = self._loop()
+            else:
+                threads = [threading.Thread(target=self._thread) for _ in range(concurrency)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                done = self.done
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f"Worker stopped after {done} job(s)."))
+
+    def _stop(self, signum, frame):
+        self.stdout.write("Finishing running jobs, then stopping...")
+        self.stopping.set()
+
+    def _thread(self):
+        n = self._loop()
+        connection.close()
+        with self.lock:
+            self.done += n
+
+    def _loop(self):
+        worker_id, done = get_random_string(32), 0
+        while not self.stopping.is_set():
+            close_old_connections()
+            job = self.backend.claim(self.queues, worker_id)
+            if job is None:
+                if self.burst:
+                    break
+                self.stopping.wait(self.poll_interval)
+                continue
+            started = time.perf_counter()
+            job = self.backend.run(job)
+            done += 1
+            if job.status == TaskResultStatus.READY:
+                outcome = "failed, will retry"
+            else:
+                outcome = job.get_status_display().lower()
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f"{job.task_path} {job.pk} {outcome} in {elapsed:.0f} ms (attempt {job.attempts})")
+        return done
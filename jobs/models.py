@@ -0,0 +1,67 @@
+import uuid
+
+from django.db import models
+from django.db.models import Q
+from django.tasks import TaskResult, TaskResultStatus
+from django.tasks.base import TaskError
+from django.utils.module_loading import import_string
+
+
+class Job(models.Model):
+    """A task enqueued through ``jobs.backends.DatabaseBackend``."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    backend = models.CharField(max_length=32)
+    task_path = models.CharField(max_length=255)
+    queue_name = models.CharField(max_length=32)
+    priority = models.SmallIntegerField(default=0)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=TaskResultStatus.choices, default=TaskResultStatus.READY)
+    # Not before this time; also pushed back between retries.
+    run_after = models.DateTimeField()
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    last_attempted_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker_ids = models.JSONField(default=list)
+    # [{"exception_class_path": ..., "traceback": ...}], one per failed attempt.
+    errors = models.JSONField(default=list)
+    return_value = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query only ever looks at runnable rows.
+            models.Index(
+                fields=["queue_name", "-priority", "run_after"],
+                condition=Q(status=TaskResultStatus.READY),
+                name="jobs_job_ready_idx",
+            ),
+        ]
+
+    @property
+    def attempts(self):
+        return len(self.worker_ids)
+
+    def to_result(self):
+        task = import_string(self.task_path).using(
+            priority=self.priority, queue_name=self.queue_name, backend=self.backend,
+        )
+        result = TaskResult(
+            task=task,
+            id=str(self.pk),
+            status=TaskResultStatus(self.status),
+            enqueued_at=self.enqueued_at,
+            started_at=self.started_at,
+            last_attempted_at=self.last_attempted_at,
+            finished_at=self.finished_at,
+            args=self.args,
+            kwargs=self.kwargs,
+            backend=self.backend,
+            errors=[TaskError(**error) for error in self.errors],
+            worker_ids=list(self.worker_ids),
+        )
+        object.__setattr__(result, "_return_value", self.return_value)
+        return result
+
+    def __str__(self):
+        return f"{self.task_path} ({self.get_status_display()})"
@@ -0,0 +1,171 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from blog.models import Comment, Post
+
+from .models import AuthorStats, DailyActivity
+
+FIELDS = ("posts", "published_posts", "comments")
+
+
+def _cache_key(user_id):
+    return f"activity:{user_id}"
+
+
+def _increment(model, lookup, deltas):
+    deltas = {field: n for field, n in deltas.items() if n}
+    if not deltas:
+        return
+    rows = model.objects.filter(**lookup)
+    increments = {field: F(field) + n for field, n in deltas.items()}
+    # A missing row only needs creating for additions; decrements of a row
+    # that is gone (e.g. while the user itself is being deleted) are no-ops.
+    if not rows.update(**increments) and any(n > 0 for n in deltas.values()):
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **deltas)
+        except IntegrityError:
+            # Another request created the row first.
+            rows.update(**increments)
+
+
+def record(user_id, when, **deltas):
+    """Add ``deltas`` (posts/published_posts/comments) to the day of ``when``."""
+    if not user_id:
+        return
+    _increment(DailyActivity, {"user_id": user_id, "day": timezone.localdate(when)}, deltas)
+    cache.delete(_cache_key(user_id))
+
+
+def record_stats(user_id, **deltas):
+    """Add ``deltas`` (published_posts/draft_posts/comments) to the author's totals."""
+    if user_id:
+        _increment(AuthorStats, {"user_id": user_id}, deltas)
+
+
+def stats_for(user):
+    return AuthorStats.objects.filter(user=user).first() or AuthorStats(user=user)
+
+
+def rebuild(users=None):
+    """Recompute the rollup and author totals, e.g. after bulk imports."""
+    posts, comments, existing = Post.objects.all(), Comment.objects.all(), DailyActivity.objects.all()
+    if users is not None:
+        posts = posts.filter(author__in=users)
+        comments = comments.filter(author__in=users)
+        existing = existing.filter(user__in=users)
+    rows = {}
+    for entry in (posts.annotate(day=TruncDate("created_at")).values("author_id", "day")
+                  .annotate(posts=Count("id"), published_posts=Count("id", filter=Q(published=True)))
+                  .order_by()):
+        rows[entry["author_id"], entry["day"]] = entry
+    for entry in (comments.exclude(author=None).annotate(day=TruncDate("created_at"))
+                  .values("author_id", "day").annotate(comments=Count("id")).order_by()):
+        rows.setdefault((entry["author_id"], entry["day"]), {}).update(entry)
+    totals = {}
+    for (user_id, _), entry in rows.items():
+        stats = totals.setdefault(user_id, AuthorStats(user_id=user_id))
+        stats.published_posts += entry.get("published_posts", 0)
+        stats.draft_posts += entry.get("posts", 0) - entry.get("published_posts", 0)
+        stats.comments += entry.get("comments", 0)
+    with transaction.atomic():
+        user_ids = set(existing.values_list("user_id", flat=True)) | set(totals)
+        existing.delete()
+        DailyActivity.objects.bulk_create(
+            DailyActivity(user_id=user_id, day=day, **{f: entry.get(f, 0) for f in FIELDS})
+            for (user_id, day), entry in rows.items()
+        )
+        stale_stats = AuthorStats.objects.all() if users is None else AuthorStats.objects.filter(user__in=users)
+        stale_stats.delete()
+        AuthorStats.objects.bulk_create(totals.values())
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def _level(count):
+    if count == 0:
+        return 0
+    if count == 1:
+        return 1
+    if count == 2:
+        return 2
+    if count <= 4:
+        return 3
+    return 4
+
+
+def _build_grid(start_date, today, post_counts):
+    # Pad grid to full weeks (Monday … Sunday)
+    grid_start = start_date - timedelta(days=start_date.weekday())
+    grid_end = today + timedelta(days=(6 - today.weekday()))
+
+    weeks = []
+    month_row = []   # one label (or '') per week column
+    prev_month = None
+    d = grid_start
+
+    while d <= grid_end:
+        week = []
+        for _ in range(7):
+            outside = d < start_date or d > today
+            count = post_counts.get(d, 0)
+            week.append({
+                "date": d,
+                "count": count,
+                "level": 0 if outside else _level(count),
+                "outside": outside,
+                "label": (
+                    f"{d.strftime('%b %d, %Y')}: {count} post{'s' if count != 1 else ''}"
+                    if not outside else ""
+                ),
+            })
+            d += timedelta(days=1)
+
+        # Month label: first non-outside day whose month changed
+        col_label = ""
+        for day in week:
+            if not day["outside"]:
+                if day["date"].month != prev_month:
+                    col_label = day["date"].strftime("%b")
+                    prev_month = day["date"].month
+                break
+
+        month_row.append(col_label)
+        weeks.append(week)
+
+    return weeks, month_row
+
+
+def profile_activity(user):
+    """Stats totals and heatmap grid for ``user``, from one rollup query.
+
+    The result is cached per user until their next write or the next day.
+    """
+    today = date.today()
+    cached = cache.get(_cache_key(user.pk))
+    if cached and cached["today"] == today:
+        return cached
+
+    totals = dict.fromkeys(FIELDS, 0)
+    post_counts = {}
+    for day, *counts in DailyActivity.objects.filter(user=user).values_list("day", *FIELDS):
+        for field, n in zip(FIELDS, counts):
+            totals[field] += n
+        post_counts[day] = counts[0]
+
+    weeks, month_row = _build_grid(user.date_joined.date(), today, post_counts)
+    activity = {
+        "today": today,
+        "total_posts": totals["posts"],
+        "published_posts": totals["published_posts"],
+        "draft_posts": totals["posts"] - totals["published_posts"],
+        "total_comments": totals["comments"],
+        "weeks": weeks,
+        "month_row": month_row,
+    }
+    cache.set(_cache_key(user.pk), activity, timeout=60 * 60 * 24)
+    return activity
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user import activity
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user daily activity rollup from posts and comments."
+
+    def handle(self, *args, **options):
+        activity.rebuild()
+        self.stdout.write(self.style.SUCCESS("Daily activity rebuilt."))
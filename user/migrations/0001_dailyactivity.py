@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def backfill(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    DailyActivity = apps.get_model('user', 'DailyActivity')
+    rows = {}
+    posts = (Post.objects.annotate(day=TruncDate('created_at')).values('author_id', 'day')
+             .annotate(posts=Count('id'), published_posts=Count('id', filter=Q(published=True))).order_by())
+    comments = (Comment.objects.exclude(author=None).annotate(day=TruncDate('created_at'))
+                .values('author_id', 'day').annotate(comments=Count('id')).order_by())
+    for entry in [*posts, *comments]:
+        rows.setdefault((entry.pop('author_id'), entry.pop('day')), {}).update(entry)
+    DailyActivity.objects.bulk_create(
+        DailyActivity(user_id=user_id, day=day, **counts) for (user_id, day), counts in rows.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('blog', '0005_post_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('posts', models.IntegerField(default=0)),
+                ('published_posts', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_activity')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    AuthorStats = apps.get_model('user', 'AuthorStats')
+    stats = {}
+    for row in (Post.objects.values('author_id').order_by()
+                .annotate(n_published=Count('pk', filter=Q(published=True)),
+                          n_drafts=Count('pk', filter=Q(published=False)))):
+        stats[row['author_id']] = AuthorStats(
+            user_id=row['author_id'], published_posts=row['n_published'], draft_posts=row['n_drafts'])
+    for row in Comment.objects.exclude(author=None).values('author_id').order_by().annotate(n=Count('pk')):
+        stats.setdefault(row['author_id'], AuthorStats(user_id=row['author_id'])).comments = row['n']
+    AuthorStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0001_dailyactivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('published_posts', models.IntegerField(default=0)),
+                ('draft_posts', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'author stats',
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
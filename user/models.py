@@ -1 +1,39 @@
-# No custom models — using Django's built-in User model.
+# Uses Django's built-in User model; the models here are per-user rollups.
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class DailyActivity(models.Model):
+    """Posts and comments a user created on one day, kept up to date on write.
+
+    Backs the profile heatmap and stats tiles so a profile load reads one
+    row per active day instead of aggregating the user's whole history.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_activity")
+    day = models.DateField()
+    posts = models.IntegerField(default=0)
+    published_posts = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="unique_daily_activity"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} on {self.day}"
+
+
+class AuthorStats(models.Model):
+    """Running per-author totals, kept up to date on write."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    published_posts = models.IntegerField(default=0)
+    draft_posts = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "author stats"
+
+    def __str__(self):
+        return f"Stats for {self.user}"
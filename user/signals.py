@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from blog.models import Comment, Post
+
+from . import activity
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance.author_id, instance.created_at,
+                        posts=1, published_posts=int(instance.published))
+        activity.record_stats(instance.author_id, published_posts=int(instance.published),
+                              draft_posts=int(not instance.published))
+        return
+    was = getattr(instance, "published_was", None)
+    if was is not None and was != instance.published:
+        delta = 1 if instance.published else -1
+        activity.record(instance.author_id, instance.created_at, published_posts=delta)
+        activity.record_stats(instance.author_id, published_posts=delta, draft_posts=-delta)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    published = getattr(instance, "published_was", instance.published)
+    activity.record(instance.author_id, instance.created_at,
+                    posts=-1, published_posts=-int(published))
+    activity.record_stats(instance.author_id, published_posts=-int(published), draft_posts=-int(not published))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance.author_id, instance.created_at, comments=1)
+        activity.record_stats(instance.author_id, comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    activity.record(instance.author_id, instance.created_at, comments=-1)
+    activity.record_stats(instance.author_id, comments=-1)
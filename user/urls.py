@@ -1,5 +1,7 @@
 from django.urls import path
 
+from blog.feeds import author_atom, author_rss
+
 from . import views
 
 app_name = "user"
@@ -8,4 +10,6 @@ urlpatterns = [
     path("register/", views.RegisterView.as_view(), name="register"),
     path("profile/", views.profile, name="profile"),
     path("<str:username>/", views.public_profile, name="public-profile"),
+    path("<str:username>/feed/rss/", author_rss, name="feed-rss"),
+    path("<str:username>/feed/atom/", author_atom, name="feed-atom"),
 ]